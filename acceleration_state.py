@@ -4,7 +4,13 @@ from scipy.spatial.transform import Rotation as R
 class AccelerationState:
     """
     Represents the acceleration state of an object, including translational and rotational components.
+    \n
+    The six values live in one float array, `_data` (Tx, Ty, Tz, Rx, Ry, Rz); `translation` and
+    `rotation` are views into it. A TotalAccelerationState's local and global parts are
+    AccelerationStates viewing its own buffer.
     """
+    __slots__ = ("_data", "local")
+
     def __init__(self, *,
                  Tx: float = 0,
                  Ty: float = 0,
@@ -19,10 +25,42 @@ class AccelerationState:
         If `local` is set, it's a shorthand for
         `TotalAccelerationState((global/local)_acceleration=AccelerationState(...))`
         """
-        self.translation = np.array([Tx, Ty, Tz])
-        self.rotation = np.array([Rx, Ry, Rz])
+        self._data = np.array([Tx, Ty, Tz, Rx, Ry, Rz], dtype=float)
         self.local = local
 
+    @classmethod
+    def _view(cls, data: np.ndarray, local: bool) -> "AccelerationState":
+        """An AccelerationState backed by `data` (six floats) instead of its own array."""
+        state = cls.__new__(cls)
+        state._data = data
+        state.local = local
+        return state
+
+    @property
+    def translation(self) -> np.ndarray:
+        return self._data[0:3]
+
+    @translation.setter
+    def translation(self, value):
+        self._data[0:3] = value
+
+    @property
+    def rotation(self) -> np.ndarray:
+        return self._data[3:6]
+
+    @rotation.setter
+    def rotation(self, value):
+        self._data[3:6] = value
+
+    def copy(self) -> "AccelerationState":
+        return AccelerationState._view(self._data.copy(), self.local)
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
     def rotation_obj(self) -> R:
         """
         Returns a scipy Rotation object from the current rotation vector (assumed to be Euler angles in radians, order xyz).
@@ -54,12 +92,9 @@ class AccelerationState:
             raise TypeError(f"Unsupported operand type for +: AccelerationState and {type(other)}")
 
         if self.local is None or other.local is None or self.local == other.local:
-            t = self.translation + other.translation
-            r = self.rotation + other.rotation
-            return AccelerationState(
-                Tx=t[0], Ty=t[1], Tz=t[2],
-                Rx=r[0], Ry=r[1], Rz=r[2],
-                local=self.local if self.local is not None else other.local
+            return AccelerationState._view(
+                self._data + other._data,
+                self.local if self.local is not None else other.local
             )
         else:
             if(self.local):
@@ -82,35 +117,95 @@ class TotalAccelerationState:
     """
     Represents the total acceleration state of an object, including acceleration in
     local space and global space.
+    \n
+    Both parts share one 12-float buffer, local first. It can be used as an accumulator without
+    allocating: `clear` it, add tasks' and subtasks' states into it with `+=`, then
+    `extract_into` a preallocated array.
     """
+    __slots__ = ("_data", "_local", "_global", "_global_pairs", "_scratch", "_scratch_flat")
+
     def __init__(self, local_acceleration=None, global_acceleration=None):
-        self.local_acceleration = local_acceleration if local_acceleration is not None else AccelerationState()
-        self.global_acceleration = global_acceleration if global_acceleration is not None else AccelerationState()
+        self._data = np.zeros(12)
+        self._local = AccelerationState._view(self._data[0:6], True)
+        self._global = AccelerationState._view(self._data[6:12], False)
 
-        self.local_acceleration.local = True
-        self.global_acceleration.local = False
+        # global translation and rotation as rows, to de-rotate both with one matmul
+        self._global_pairs = self._data[6:12].reshape(2, 3)
+        self._scratch = np.empty((2, 3))
+        self._scratch_flat = self._scratch.reshape(6)
 
-    def __add__(self, other: "TotalAccelerationState"):
+        if local_acceleration is not None:
+            self._data[0:6] = local_acceleration._data
+        if global_acceleration is not None:
+            self._data[6:12] = global_acceleration._data
+
+    @property
+    def local_acceleration(self) -> AccelerationState:
+        return self._local
+
+    @local_acceleration.setter
+    def local_acceleration(self, value: AccelerationState):
+        self._data[0:6] = value._data
+
+    @property
+    def global_acceleration(self) -> AccelerationState:
+        return self._global
+
+    @global_acceleration.setter
+    def global_acceleration(self, value: AccelerationState):
+        self._data[6:12] = value._data
+
+    def copy(self) -> "TotalAccelerationState":
         new_state = TotalAccelerationState()
-        if isinstance(other, AccelerationState):
-            other = other.to_total()
+        new_state._data[:] = self._data
+        return new_state
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def clear(self):
+        """Zero both parts in place."""
+        self._data.fill(0.0)
 
-        if not isinstance(other, TotalAccelerationState):
+    def __iadd__(self, other):
+        if isinstance(other, TotalAccelerationState):
+            self._data += other._data
+        elif isinstance(other, AccelerationState):
+            # same convention as `AccelerationState.to_total`: unset `local` means global
+            part = self._local if other.local else self._global
+            part._data += other._data
+        else:
+            raise TypeError(f"Unsupported operand type for +=: TotalAccelerationState and {type(other)}")
+        return self
+
+    def __add__(self, other: "TotalAccelerationState"):
+        if not isinstance(other, (AccelerationState, TotalAccelerationState)):
             raise TypeError(f"Unsupported operand type for +: TotalAccelerationState and {type(other)}")
-        new_state.local_acceleration = self.local_acceleration + other.local_acceleration
-        new_state.global_acceleration = self.global_acceleration + other.global_acceleration
+        new_state = self.copy()
+        new_state += other
         return new_state
 
+    def extract_into(self, rotation_matrix: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """
+        Allocation-free `extract_acceleration`: writes the combined local space (Tx, Ty, Tz, Rx, Ry, Rz)
+        into `out`, a float array of six. `rotation_matrix` is the current rotation as a 3x3 matrix.
+        """
+        # v @ R is R^T v, the global vector de-rotated into local space
+        np.matmul(self._global_pairs, rotation_matrix, out=self._scratch)
+        np.add(self._local._data, self._scratch_flat, out=out)
+        return out
+
     def extract_acceleration(self, rotation: R) -> AccelerationState:
         """
         Combines local and global acceleration states into a single local space `AccelerationState` object.
         The current rotation must be passed in as a SciPy rotation to de-rotate the global acceleration.
         """
-        local_accel = self.local_acceleration
-        global_accel = self.global_acceleration.rotate(rotation.inv())
-        global_accel.local = True
-        local_accel.local = True
-        return local_accel + global_accel
+        combined = AccelerationState(local=True)
+        self.extract_into(rotation.as_matrix(), combined._data)
+        return combined
 
     def __str__(self):
-        return f"TotalAccelerationState: Local={self.local_acceleration}, Global={self.global_acceleration}"
\ No newline at end of file
+        return f"TotalAccelerationState: Local={self.local_acceleration}, Global={self.global_acceleration}"
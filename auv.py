@@ -1,6 +1,5 @@
 import numpy as np
 import traceback
-import copy
 import time
 from typing import Callable, List
 from scipy.spatial.transform import Rotation as R
@@ -8,8 +7,9 @@ from scipy.spatial.transform import Rotation as R
 from ezauv.hardware.motor_controller import MotorController
 from ezauv.hardware.sensor_interface import SensorInterface
 from ezauv.mission.mission import Path, Subtask
-from ezauv.utils import Logger, LogLevel, Clock
+from ezauv.utils import Logger, LogLevel, Clock, LoopScheduler
 from ezauv.map import Map
+from ezauv import TotalAccelerationState
 from ezauv.telemetry import TELEMETRY
 
 class AUV:
@@ -19,6 +19,7 @@ class AUV:
                  sensors: SensorInterface,              # the interface for sensor data
                  pin_kill: Callable = lambda: None,     # an emergency kill function; should disable all motors via pins
                  clock: Clock = Clock(),                # the clock to use for timing
+                 busy_wait: float = 0.0,                # how long to spin instead of sleep before each loop deadline
 
                  logging: bool = False,                 # whether to save log to file
                  console: bool = True,                  # whether to print log to console
@@ -43,6 +44,7 @@ class AUV:
         console: whether to print log to console
         """
         self.refresh_rate = refresh_rate
+        self.busy_wait = busy_wait
         self.motor_controller = motor_controller
         self.sensors = sensors
         self.pin_kill = pin_kill
@@ -55,6 +57,7 @@ class AUV:
 
         self.motor_controller.log = self.logger.create_sourced_logger("MOTOR")
         self.sensors.log = self.logger.create_sourced_logger("SENSOR")
+        self.sensors.clock = self.clock
 
         self.logger.log("Sub enabled")
         self.motor_controller.overview()
@@ -80,6 +83,8 @@ class AUV:
 
         self.logger.log("Beginning path")
 
+        scheduler = LoopScheduler(self.refresh_rate, self.clock, self.busy_wait)
+        wanted_direction = TotalAccelerationState()  # reused every iteration
         try:
             for task in mission.path:
                 self.logger.log(f"Beginning task {task.name()}")
@@ -87,17 +92,24 @@ class AUV:
                 now = self.clock.perf_counter()
                 prev_update = now
                 task.start(self.map)
+                scheduler.start()
                 while(not task.finished()):
                     now, prev_update = self.clock.perf_counter(), now
                     dt = now - prev_update
                     sensor_data = self.sensors.get_data()
                     sensor_data["dt"] = dt
-                    a = time.perf_counter()
+                    scheduler.lap("sensor read")
+
                     self.map.update(sensor_data)
-                    wanted_direction = copy.deepcopy(task.wanted_acceleration(self.map))
+                    scheduler.lap("map update")
+
+                    wanted_direction.clear()
+                    wanted_direction += task.wanted_acceleration(self.map)
                     for subtask in self.subtasks:
                         wanted_direction += subtask.update()
                     rotation = sensor_data["rotation"] if "rotation" in sensor_data else R.identity()
+                    scheduler.lap("task")
+
                     solve_start = time.perf_counter()
                     solved_motors = self.motor_controller.solve(
                         wanted_direction,
@@ -105,25 +117,25 @@ class AUV:
                         self.lock_to_yaw
                     )
                     TELEMETRY.submit("solve time", time.perf_counter() - solve_start)
+                    scheduler.lap("solve")
 
                     if(solved_motors[0]):
                         self.motor_controller.set_motors(solved_motors[1])
-                    
-                    time_till_refresh = self.refresh_rate - (self.clock.perf_counter() - prev_update)
-                    # print("Time taken for loop (s):", np.round(self.clock.perf_counter() - prev_update, 4))
-                    if(time_till_refresh > 0):
-                        self.clock.sleep(time_till_refresh)
-                    d = time.perf_counter()
+                    scheduler.lap("motor write")
+
+                    scheduler.wait()
                     TELEMETRY.submit("loop time", self.clock.perf_counter() - prev_update)
+                    TELEMETRY.submit("deadline misses", scheduler.misses)
                     TELEMETRY.step(self.clock.perf_counter())
-                    # if self.clock.perf_counter() - prev_update > 0.3:
-                        # print(b - a, c - b, d - c)
-                        # raise TimeoutError("Main loop is taking too long (>300ms)")
 
         except:
             self.logger.log(traceback.format_exc(), level=LogLevel.ERROR)
     
         finally:
+            if scheduler.iterations:
+                level = LogLevel.INFO if scheduler.misses == 0 else LogLevel.WARNING
+                self.logger.log(f"Loop timing:\n{scheduler.summary()}", level=level)
+
             self.logger.log("Killing sub")
 
 
@@ -152,5 +164,6 @@ class AUV:
             if end_telemetry:
                 TELEMETRY.kill()
 
+            self.sensors.kill()
             self.map.kill()
             self.logger.end()
\ No newline at end of file
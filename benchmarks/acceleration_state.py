@@ -0,0 +1,82 @@
+"""
+Memory churn of building a tick's wanted acceleration.
+
+Run with `python -m ezauv.benchmarks.acceleration_state`. Compares the old loop body (deepcopy the
+task's state, `+` each subtask's, `extract_acceleration`) against accumulating into one reused
+TotalAccelerationState and `extract_into` a preallocated array. Reports the peak traced memory
+per tick and the net blocks left allocated afterwards, measured with tracemalloc.
+"""
+import copy
+import time
+import tracemalloc
+import numpy as np
+from scipy.spatial.transform import Rotation as R
+
+from ezauv import AccelerationState, TotalAccelerationState
+
+
+def copy_and_add(task_state, subtask_states, rotation, out):
+    wanted = copy.deepcopy(task_state)
+    for state in subtask_states:
+        wanted = wanted + state
+    acceleration = wanted.extract_acceleration(rotation)
+    return np.append(acceleration.translation, acceleration.rotation)
+
+
+def accumulate(buffer, task_state, subtask_states, rotation_matrix, out):
+    buffer.clear()
+    buffer += task_state
+    for state in subtask_states:
+        buffer += state
+    return buffer.extract_into(rotation_matrix, out)
+
+
+def measure(tick, ticks):
+    """Returns (mean us per tick, peak bytes per tick, net blocks after all ticks)."""
+    tick()  # warm up lazily built numpy/scipy state
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        tick()
+    elapsed = (time.perf_counter() - start) / ticks * 1e6
+
+    tracemalloc.start()
+    peaks = np.zeros(ticks)
+    before = tracemalloc.take_snapshot()
+    for i in range(ticks):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        tick()
+        peaks[i] = tracemalloc.get_traced_memory()[1] - base
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    return elapsed, peaks.mean(), blocks
+
+
+def run(ticks=2000):
+    task_state = TotalAccelerationState(
+        local_acceleration=AccelerationState(Tx=0.4, Rz=0.1),
+        global_acceleration=AccelerationState(Ty=-0.2),
+    )
+    subtask_states = [AccelerationState(Rz=0.05, local=True), AccelerationState(Tx=0.01, local=False)]
+    rotation = R.from_euler('z', 0.3)
+    rotation_matrix = rotation.as_matrix()
+
+    buffer = TotalAccelerationState()
+    out = np.zeros(6)
+
+    paths = [
+        ("copy + add", lambda: copy_and_add(task_state, subtask_states, rotation, out)),
+        ("in-place buffer", lambda: accumulate(buffer, task_state, subtask_states, rotation_matrix, out)),
+    ]
+
+    print(f"{'path':<18}{'us/tick':>10}{'peak B/tick':>14}{'net blocks':>12}")
+    for name, tick in paths:
+        elapsed, peak, blocks = measure(tick, ticks)
+        print(f"{name:<18}{elapsed:>10.2f}{peak:>14.0f}{blocks:>12}")
+
+
+if __name__ == "__main__":
+    run()
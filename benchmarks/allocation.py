@@ -0,0 +1,177 @@
+"""
+Per-solve latency of the motor allocation modes.
+
+Run with `python -m ezauv.benchmarks.allocation`. Every mode is run over the same random walk of
+wanted accelerations, free and locked to yaw, and the ticks whose commands sit inside a deadzone
+are counted, as are the ticks with no solution: locked to yaw, OFFSET and ACTIVE_SET fail when no
+command meets the wanted roll and pitch, as on the planar vehicle. The gurobi OFFSET path is skipped if gurobipy is not installed.
+\n
+ACTIVE_SET is also checked against a brute-force search: on a sample of ticks, every assignment
+of the motors to off, forward and reverse is solved, and the best one, confirmed with scipy's
+SLSQP, is compared with the allocator's, error first and then effort. Ticks where it stopped at
+max_nodes are counted.
+"""
+import itertools
+import time
+import numpy as np
+from scipy.optimize import minimize
+
+from ezauv.hardware.active_set_allocator import ActiveSetAllocator
+from ezauv.hardware.motor_controller import DeadzoneOptimizer, OptimizerType, Model
+
+
+def planar_vehicle():
+    """Four vectored thrusters in the horizontal plane, like the RoboBoat hull."""
+    d = 1 / np.sqrt(2)
+    return np.array([
+        [d, d, d, d],
+        [d, -d, -d, d],
+        [0, 0, 0, 0],
+        [0, 0, 0, 0],
+        [0, 0, 0, 0],
+        [-1, 1, -1, 1],
+    ])
+
+
+def six_dof_vehicle(seed=0):
+    """Eight thrusters with random placement, spanning all six axes."""
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(6, 8))
+
+
+def time_optimizer(optimizer, wanted, deadzones, lock_to_yaw=False):
+    latencies = []
+    residuals = []
+    inside = 0
+    dz_lo, dz_hi = np.array(deadzones).T
+    for V in wanted:
+        start = time.perf_counter()
+        ok, u = optimizer.optimize(V, lock_to_yaw)
+        latencies.append(time.perf_counter() - start)
+        residuals.append(np.linalg.norm(optimizer.M @ u - V) if ok else np.nan)
+        inside += bool(ok and np.any((u > dz_lo + 1e-6) & (u < dz_hi - 1e-6) & (np.abs(u) > 1e-6)))
+    return np.array(latencies) * 1e6, np.array(residuals), inside
+
+
+def mean_residual(residuals):
+    """The mean over the ticks that were solved; nan if none were."""
+    solved = residuals[~np.isnan(residuals)]
+    return solved.mean() if len(solved) else np.nan
+
+
+def brute_force(allocator, V, lock_to_yaw):
+    """
+    The lowest stage values of any assignment of modes, each assignment solved from scratch, or
+    None if none can hold the locked rows.
+    """
+    stages = allocator._stages[bool(lock_to_yaw)]
+    n = allocator.n
+    best_values, best_modes = (np.inf,) * len(stages), None
+    for modes in itertools.product((allocator.REVERSE, allocator.OFF, allocator.FORWARD), repeat=n):
+        modes = np.array(modes)
+        if not allocator.mode_ok[modes + 1, np.arange(n)].all():
+            continue
+        lo, hi = allocator._boxes(modes)
+        _, _, values = allocator._solve(stages, V, lo, hi, np.zeros(n), np.zeros(n, dtype=int), best_values, modes)
+        if values is not None:
+            best_values, best_modes = values, modes
+    if best_modes is None:
+        return None
+
+    # the best assignment again, by an independent solver: SLSQP on each stage, holding the rows
+    # of the stages before through an orthonormal basis of them, as SLSQP fails on redundant ones
+    lo, hi = allocator._boxes(best_modes)
+    x = np.zeros(n)
+    constraints = []
+    values = []
+    for rows, A, E, _, _ in stages:
+        b = V[rows] if rows is not None else np.zeros(n)
+        x = minimize(lambda u: 0.5 * np.sum((A @ u - b) ** 2), x, jac=lambda u: A.T @ (A @ u - b),
+                     bounds=list(zip(lo, hi)), constraints=constraints, method="SLSQP",
+                     options=dict(ftol=1e-15, maxiter=500)).x
+        values.append(0.5 * np.sum((A @ x - b) ** 2))
+        if rows is not None:
+            held = allocator.M[np.concatenate([stage[0] for stage in stages[:len(values)]])]
+            _, s, vt = np.linalg.svd(held)
+            basis = vt[:int(np.sum(s > 1e-10 * max(s[0], 1.0)))]
+            target = basis @ x
+            constraints = [dict(type="eq", fun=lambda u, basis=basis, target=target: basis @ u - target,
+                                jac=lambda u, basis=basis: basis)]
+    values = tuple(values)
+    return values if allocator._compare(values, best_values) < 0 else best_values
+
+
+def check_active_set(M, bounds, deadzones, wanted, lock_to_yaw, checks):
+    """
+    Ticks where ACTIVE_SET was worse than the brute-force best, the largest excess in error, and
+    in effort on the ticks where the errors tie, and the ticks where it stopped at max_nodes.
+    """
+    allocator = ActiveSetAllocator(M, bounds, deadzones)
+    stages = allocator._stages[bool(lock_to_yaw)]
+    sampled = set(np.linspace(0, len(wanted) - 1, checks).astype(int))
+    worse, error_excess, effort_excess, truncated = 0, 0.0, 0.0, 0
+    for tick, V in enumerate(wanted):
+        ok, u = allocator.optimize(V, lock_to_yaw)
+        truncated += allocator.truncated
+        if tick not in sampled:
+            continue
+        best = brute_force(allocator, V, lock_to_yaw)
+        if not ok or best is None:
+            worse += ok != (best is not None)
+            continue
+        values = tuple(0.5 * np.sum((A @ u - (V[rows] if rows is not None else 0.0)) ** 2)
+                       for rows, A, _, _, _ in stages)
+        if allocator._compare(values, best) > 0:
+            worse += 1
+            if allocator._compare(values[:-1], best[:-1]) > 0:
+                error_excess = max(error_excess, values[-2] - best[-2])
+            else:
+                effort_excess = max(effort_excess, values[-1] - best[-1])
+    return worse, error_excess, effort_excess, truncated
+
+
+def wanted_trajectory(samples, seed=1):
+    """A smooth random walk of wanted accelerations, like consecutive control ticks."""
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(scale=0.05, size=(samples, 6))
+    return np.cumsum(steps, axis=0)
+
+
+def run(samples=500, checks=20):
+    modes = [
+        ("scale", dict(next_best=OptimizerType.SCALE)),
+        ("scale, compiled", dict(next_best=OptimizerType.SCALE, compiled=True)),
+        ("active set", dict(next_best=OptimizerType.ACTIVE_SET)),
+    ]
+    if Model is not None:
+        modes.append(("gurobi offset", dict(next_best=OptimizerType.OFFSET)))
+
+    vehicles = (("planar", planar_vehicle()), ("6-dof", six_dof_vehicle()))
+    wanted = wanted_trajectory(samples)
+    print(f"{'vehicle':<10}{'yaw lock':<10}{'mode':<18}{'mean us':>10}{'p99 us':>10}{'max us':>10}"
+          f"{'mean |Mu-V|':>14}{'in deadzone':>13}{'failed':>8}")
+    for vehicle, M in vehicles:
+        n = M.shape[1]
+        bounds = [(-1.0, 1.0)] * n
+        deadzones = [(-0.1, 0.1)] * n
+        for lock_to_yaw in (False, True):
+            for name, kwargs in modes:
+                optimizer = DeadzoneOptimizer(M, bounds, deadzones, **kwargs)
+                latencies, residuals, inside = time_optimizer(optimizer, wanted, deadzones, lock_to_yaw)
+                print(f"{vehicle:<10}{str(lock_to_yaw):<10}{name:<18}{latencies.mean():>10.1f}"
+                      f"{np.percentile(latencies, 99):>10.1f}{latencies.max():>10.1f}"
+                      f"{mean_residual(residuals):>14.4f}{inside:>13}{np.isnan(residuals).sum():>8}")
+
+    print(f"\nactive set against brute force on {checks} of {samples} ticks")
+    print(f"{'vehicle':<10}{'yaw lock':<10}{'worse':>7}{'error excess':>14}{'effort excess':>15}{'at limit':>10}")
+    for vehicle, M in vehicles:
+        n = M.shape[1]
+        bounds = [(-1.0, 1.0)] * n
+        deadzones = [(-0.1, 0.1)] * n
+        for lock_to_yaw in (False, True):
+            worse, error, effort, truncated = check_active_set(M, bounds, deadzones, wanted, lock_to_yaw, checks)
+            print(f"{vehicle:<10}{str(lock_to_yaw):<10}{worse:>7}{error:>14.2e}{effort:>15.2e}{truncated:>10}")
+
+
+if __name__ == "__main__":
+    run()
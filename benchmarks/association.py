@@ -0,0 +1,69 @@
+"""
+Cost of matching a frame of detections to the obstacles ObstacleMap tracks.
+
+Run with `python -m ezauv.benchmarks.association`. Fields of buoys are tracked, then seen again
+with some noise, a few missed and a few new ones. Compares the double loop update_obstacles used to
+run over every tracked obstacle and detection against `associate` with each AssociationType, and
+checks GREEDY merges the same detections into the same obstacles as the loop. The loop here goes
+over a copy of the detections; the old one removed from the list it was iterating, which skipped
+the detection after each merge.
+"""
+import time
+import numpy as np
+
+from ezauv.map.association import AssociationType, associate
+
+
+def field(count, seed=0):
+    rng = np.random.default_rng(seed)
+    size = np.sqrt(count) * 4.0  # about one buoy per 16 m²
+    positions = rng.uniform(0, size, (count, 2))
+    radii = rng.uniform(0.2, 0.8, count)
+    seen = rng.random(count) > 0.05
+    detections = positions[seen] + rng.normal(0, 0.1, (seen.sum(), 2))
+    detection_radii = radii[seen] + rng.normal(0, 0.05, seen.sum())
+    new = rng.uniform(0, size, (count // 20, 2))
+    detections = np.vstack((detections, new))
+    detection_radii = np.concatenate((detection_radii, rng.uniform(0.2, 0.8, len(new))))
+    return positions, radii, detections, detection_radii
+
+
+def loop_associate(positions, radii, detections, detection_radii, tolerance):
+    radii = list(radii)
+    remaining = list(range(len(detections)))
+    matches = []
+    for i in range(len(positions)):
+        for j in list(remaining):
+            if np.linalg.norm(positions[i] - detections[j]) + detection_radii[j] - radii[i] < tolerance:
+                radii[i] = (radii[i] + detection_radii[j]) / 2
+                remaining.remove(j)
+                matches.append((i, j))
+    return matches
+
+
+def time_call(call, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = call()
+    return (time.perf_counter() - start) / repeats * 1e3, result
+
+
+def run(counts=(50, 200, 500), tolerance=1.0, repeats=3):
+    print(f"{'buoys':>6}{'detections':>12}  {'loop ms':>9}{'greedy ms':>11}{'hungarian ms':>14}"
+          f"{'new greedy':>12}{'new hungarian':>15}")
+    for count in counts:
+        positions, radii, detections, detection_radii = field(count)
+        looped, expected = time_call(
+            lambda: loop_associate(positions, radii, detections, detection_radii, tolerance), repeats)
+        greedy, matches = time_call(
+            lambda: associate(positions, radii, detections, detection_radii, tolerance), repeats)
+        assert matches == expected
+        hungarian, assigned = time_call(
+            lambda: associate(positions, radii, detections, detection_radii, tolerance, AssociationType.HUNGARIAN),
+            repeats)
+        print(f"{count:>6}{len(detections):>12}  {looped:>9.1f}{greedy:>11.2f}{hungarian:>14.2f}"
+              f"{len(detections) - len(matches):>12}{len(detections) - len(assigned):>15}")
+
+
+if __name__ == "__main__":
+    run()
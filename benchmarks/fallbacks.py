@@ -0,0 +1,79 @@
+"""
+Cost of PathPlanner's fallbacks: moving a start out of an obstacle, and the straight-line path.
+
+Run with `python -m ezauv.benchmarks.fallbacks`. Compares the breadth-first search `find_free_point`
+used to do against the distance transform over a window it does now, from starts in the middle of
+obstacles of increasing size, and the per-cell Python loop `find_simple_path` used to pick the goal
+cell nearest the start against the vectorized one, for goals of increasing radius. Checks the new
+ones never pick a farther point; the search takes the first free cell in rings of 8-neighbours,
+which can be a diagonal one, so the transform's is sometimes nearer.
+"""
+import time
+from collections import deque
+import numpy as np
+
+from ezauv.map.grid import PathPlanner
+from ezauv.map.grid_objects import CircleGridObject, RectangleGridObject
+
+
+def bfs_free_point(planner, start, grid):
+    sy, sx = planner.world_to_grid(start)
+    h, w = grid.shape
+    visited = np.zeros((h, w), dtype=bool)
+    queue = deque([(sy, sx)])
+    visited[sy, sx] = True
+    while queue:
+        y, x = queue.popleft()
+        if not grid[y, x]:
+            return planner.grid_to_world((y, x))
+        for dy, dx in ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)):
+            ny, nx = y + dy, x + dx
+            if 0 <= ny < h and 0 <= nx < w and not visited[ny, nx]:
+                visited[ny, nx] = True
+                queue.append((ny, nx))
+    return start
+
+
+def loop_nearest_goal(planner, start, goal):
+    rows, cols, mask = goal.rasterize_window(planner.grid, planner.resolution, planner.origin)
+    ys, xs = np.nonzero(mask)
+    best_pos, best_dist = None, np.inf
+    for y, x in zip(ys + rows.start, xs + cols.start):
+        pos = planner.grid_to_world((y, x))
+        d = np.linalg.norm(pos - start)
+        if d < best_dist:
+            best_dist, best_pos = d, pos
+    return best_pos
+
+
+def time_call(call, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = call()
+    return (time.perf_counter() - start) / repeats * 1e3, result
+
+
+def run(size=100, resolution=0.1, widths=(1, 5, 20), radii=(1, 5, 20), repeats=5):
+    center = np.array([size / 2, size / 2])
+    print(f"{'obstacle m':>11}  {'search ms':>10}{'transform ms':>14}")
+    for width in widths:
+        planner = PathPlanner(((0, 0), (size, size)), resolution, 0.5, [RectangleGridObject(center, width, width)])
+        searched, a = time_call(lambda: bfs_free_point(planner, center, planner.grid), repeats)
+        transformed, b = time_call(lambda: planner.find_free_point(center, planner.grid), repeats)
+        cell = planner.grid_to_world(planner.world_to_grid(center))
+        assert np.linalg.norm(b - cell) <= np.linalg.norm(a - cell) + 1e-9
+        print(f"{width:>11}  {searched:>10.2f}{transformed:>14.2f}")
+
+    planner = PathPlanner(((0, 0), (size, size)), resolution, 0.5, [])
+    start = np.array([1.0, 1.0])
+    print(f"\n{'goal radius m':>14}  {'loop ms':>8}{'vectorized ms':>15}")
+    for radius in radii:
+        goal = CircleGridObject(center, radius)
+        looped, a = time_call(lambda: loop_nearest_goal(planner, start, goal), repeats)
+        vectorized, path = time_call(lambda: planner.find_simple_path(start, goal), repeats)
+        assert np.isclose(np.linalg.norm(a - start), np.linalg.norm(path.end - start))
+        print(f"{radius:>14}  {looped:>8.2f}{vectorized:>15.2f}")
+
+
+if __name__ == "__main__":
+    run()
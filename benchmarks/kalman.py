@@ -0,0 +1,94 @@
+"""
+Per-call latency of the 6-state FlatMap filter.
+
+Run with `python -m ezauv.benchmarks.kalman`. Times `KalmanFilter.update` for each combination of
+sensors FlatMap fuses, passing H as an array and as a cached MeasurementModel, next to the
+pinv-based update it replaced, and `KalmanFilter2D.predict` with and without process model cache
+hits.
+"""
+import time
+import numpy as np
+
+from ezauv.utils.kalman_filter import KalmanFilter2D
+
+SENSORS = {
+    "position": (0, 1),
+    "heading": (2,),
+    "velocity": (3, 4),
+    "gyro": (5,),
+}
+
+
+def make_filter():
+    R = np.diag([1e-3, 1e-3, 0.01, 0.01, 0.01, 0.01])
+    P0 = np.diag([1.0, 1.0, 0.1, 1.0, 1.0, 1.0])
+    return KalmanFilter2D(H=np.eye(6), R=R, P0=P0, x0=np.zeros(6), sigma_accel=1, sigma_gyro=5.0)
+
+
+def pinv_update(kf, z, H):
+    """The update before MeasurementModel: R built row by row, S inverted with an SVD."""
+    R = np.zeros((H.shape[0], H.shape[0]))
+    for i, row in enumerate(H):
+        idxs = np.where(row != 0)[0]
+        R[i, i] = kf.R_default[idxs[0], idxs[0]] if len(idxs) == 1 else 1e-6
+    y = z - H @ kf.x
+    for i, row in enumerate(H):
+        if row[2] == 1:
+            y[i] = (y[i] + np.pi) % (2*np.pi) - np.pi
+            break
+    S = H @ kf.P @ H.T + R
+    K = kf.P @ H.T @ np.linalg.pinv(S)
+    kf.x = kf.x + K @ y
+    kf.x[2] = (kf.x[2] + np.pi) % (2*np.pi) - np.pi
+    kf.P = (np.eye(len(kf.x)) - K @ H) @ kf.P
+
+
+def time_calls(call, repeats):
+    call()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        call()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def run(repeats=5000):
+    rng = np.random.default_rng(0)
+    combinations = [
+        ("position",),
+        ("heading", "gyro"),
+        ("position", "heading", "velocity", "gyro"),
+    ]
+
+    print(f"{'measured':<36}{'pinv us':>10}{'H array us':>12}{'model us':>10}")
+    for sensors in combinations:
+        indices = [i for sensor in sensors for i in SENSORS[sensor]]
+        z = rng.normal(size=len(indices))
+
+        kf = make_filter()
+        H = kf.measurement_model(indices).H.copy()
+        model = kf.measurement_model(indices)
+
+        # reset the covariance each call so every variant sees the same, well-conditioned S
+        P0 = kf.kf.P.copy()
+
+        def timed(update):
+            def call():
+                kf.kf.P = P0.copy()
+                update()
+            return time_calls(call, repeats)
+
+        legacy = timed(lambda: pinv_update(kf.kf, z, H))
+        array = timed(lambda: kf.update(z, H))
+        cached = timed(lambda: kf.update(z, model))
+        print(f"{', '.join(sensors):<36}{legacy:>10.1f}{array:>12.1f}{cached:>10.1f}")
+
+    kf = make_filter()
+    fixed = time_calls(lambda: kf.predict(0.01, (0.1, -0.2)), repeats)
+    jitter = iter(0.01 + rng.uniform(-1e-3, 1e-3, repeats + 1))
+    varying = time_calls(lambda: kf.predict(next(jitter), (0.1, -0.2)), repeats)
+    print(f"\npredict, fixed dt (cached model): {fixed:.1f} us")
+    print(f"predict, jittered dt (exact, uncached): {varying:.1f} us")
+
+
+if __name__ == "__main__":
+    run()
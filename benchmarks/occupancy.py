@@ -0,0 +1,95 @@
+"""
+Cost of updating PathPlanner's occupancy grid when the obstacle list changes.
+
+Run with `python -m ezauv.benchmarks.occupancy`. For each course size, compares rebuilding the grid
+with `compute_occupancy_grid` (rasterize everything, then one distance transform over the map)
+against `set_objects` on the incremental OccupancyLayer, when one buoy moves and when the same
+list is sent again. Checks the two grids agree.
+\n
+Also times rasterizing one new CircleGridObject: to a full grid, to a window by evaluating the SDF,
+and to a window from the shared disk stamps, and moving a RollingOccupancy window a quarter of its
+width across a long course against building a new one at the same place.
+"""
+import time
+import numpy as np
+
+from ezauv.map.grid import PathPlanner
+from ezauv.map.grid_objects import CircleGridObject, StaticSDFGridObject
+from ezauv.map.occupancy import RollingOccupancy
+from ezauv.benchmarks.planner import scene
+
+
+def time_call(call, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        call()
+    return (time.perf_counter() - start) / repeats * 1e3
+
+
+def run(sizes=(20, 50, 100), density=0.1, resolution=0.1, repeats=10):
+    print(f"{'size m':>7}{'buoys':>7}  {'full rebuild ms':>16}{'one moved ms':>14}{'unchanged ms':>14}")
+    for size in sizes:
+        obstacles = scene(size, density)
+        planner = PathPlanner(((0, 0), (size, size)), resolution, 0.5, obstacles)
+        full = time_call(lambda: planner.compute_occupancy_grid(planner.shape, obstacles), repeats)
+
+        moves = iter(range(1, 2 * repeats + 2))
+
+        def move():
+            last = obstacles[-1]
+            moved = CircleGridObject(last.center + 0.05 * next(moves), last.radius)
+            planner.set_objects(obstacles[:-1] + [moved])
+
+        move()  # warm up
+        moved = time_call(move, repeats)
+        current = list(planner.obstacles)
+        unchanged = time_call(lambda: planner.set_objects(list(current)), repeats)
+
+        assert np.array_equal(planner.grid, planner.compute_occupancy_grid(planner.shape, current))
+        print(f"{size:>7}{len(obstacles):>7}  {full:>16.1f}{moved:>14.2f}{unchanged:>14.2f}")
+
+    grid = np.zeros((1000, 1000), dtype=bool)
+    origin = np.zeros(2)
+    rng = np.random.default_rng(0)
+    centers = iter(rng.uniform(10, 90, (3 * repeats * 100, 2)))
+
+    def circle():
+        return CircleGridObject(next(centers), 0.7)
+
+    calls = [
+        ("full grid", lambda: circle().rasterize(grid, resolution, origin)),
+        ("SDF window", lambda: StaticSDFGridObject._rasterize_window(circle(), grid, resolution, origin)),
+        ("stamp window", lambda: circle().rasterize_window(grid, resolution, origin)),
+    ]
+    print("\nrasterizing a new 0.7 m buoy on a 100 m course")
+    for name, call in calls:
+        print(f"{name:<16}{time_call(call, repeats * 100) * 1e3:>8.1f} us")
+
+    course, window = 200, 40
+    obstacles = scene(course, density)
+    side = int(window / resolution)
+    layer = RollingOccupancy((side, side), resolution, (0, 0), 0.5)
+    layer.set_objects(obstacles)
+    steps = iter(range(1, repeats + 2))
+
+    def shift():
+        step = next(steps) * side // 4
+        layer.shift((step, step))
+
+    def rebuild():
+        fresh = RollingOccupancy((side, side), resolution, (0, 0), 0.5, layer.offset)
+        fresh.set_objects(obstacles)
+        return fresh
+
+    shifted = time_call(shift, repeats)
+    rebuilt = time_call(rebuild, repeats)
+    unrolled = time_call(lambda: np.roll(layer.grid, 1, axis=0), repeats)
+    assert np.array_equal(layer.window(), rebuild().window())
+    print(f"\na {window} m window over a {course} m course of {len(obstacles)} buoys, moved {window / 4:g} m")
+    print(f"{'shift':<16}{shifted:>8.2f} ms")
+    print(f"{'rebuild':<16}{rebuilt:>8.2f} ms")
+    print(f"{'unroll':<16}{unrolled:>8.2f} ms")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,68 @@
+"""
+Cost of the nearest-point queries a follower makes on a Path every tick.
+
+Run with `python -m ezauv.benchmarks.path`. Follows paths of increasing length with a noisy
+position, making the calls WaypointTask and ObstacleMap make each tick (`need_replan`'s
+`distance_from_path_squared`, then `lookahead_point`), and compares `nearest_point` against
+projecting onto every segment, which it replaced. Checks both find the same point, including for
+positions anywhere on the course.
+"""
+import time
+import numpy as np
+
+from ezauv.map.path import Path
+
+
+class ProjectAll(Path):
+    def nearest_point(self, location):
+        P = np.asarray(location, dtype=float)
+        t = np.clip(np.sum((P - self.A) * self.V, axis=1) / self.V2, 0.0, 1.0)
+        diff = P - (self.A + t[:, None] * self.V)
+        i = np.argmin(np.sum(diff * diff, axis=1))
+        return i, t[i]
+
+
+def wandering_path(segments, rng):
+    headings = np.cumsum(rng.normal(0, 0.3, segments))
+    steps = np.column_stack((np.cos(headings), np.sin(headings))) * rng.uniform(0.1, 0.5, (segments, 1))
+    return Path(np.vstack(([0.0, 0.0], np.cumsum(steps, axis=0))))
+
+
+def follow(path, rng, ticks):
+    """Positions along the path with tracking error, one per tick."""
+    distances = np.linspace(0, path.total_length, ticks)
+    return np.array([path.point_at_distance(d) for d in distances]) + rng.normal(0, 0.3, (ticks, 2))
+
+
+def check(path, locations):
+    indexed, reference = Path(path.waypoints), ProjectAll(path.waypoints)
+    for location in locations:
+        assert np.isclose(indexed.distance_from_path_squared(location),
+                          reference.distance_from_path_squared(location))
+
+
+def time_ticks(path, locations):
+    start = time.perf_counter()
+    for location in locations:
+        path.distance_from_path_squared(location)
+        path.lookahead_point(location, 0.5)
+    return (time.perf_counter() - start) / len(locations) * 1e6
+
+
+def run(sizes=(50, 500, 5000), ticks=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    print(f"{'segments':>9}  {'every segment us':>17}{'nearest_point us':>18}")
+    for size in sizes:
+        path = wandering_path(size, rng)
+        locations = follow(path, rng, ticks)
+
+        full, indexed = (time_ticks(cls(path.waypoints), locations) for cls in (ProjectAll, Path))
+
+        lo, hi = path.waypoints.min(axis=0) - 5, path.waypoints.max(axis=0) + 5
+        check(path, locations)
+        check(path, rng.uniform(lo, hi, (ticks, 2)))
+        print(f"{size:>9}  {full:>17.1f}{indexed:>18.1f}")
+
+
+if __name__ == "__main__":
+    run()
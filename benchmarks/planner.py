@@ -0,0 +1,183 @@
+"""
+Latency of PathPlanner.find_path for each search type, over grid sizes and obstacle densities.
+
+Run with `python -m ezauv.benchmarks.planner`. Each scene is a square course scattered with
+circular buoys, planned corner to corner. Reports the mean time of a first plan on a new planner,
+the cells expanded (for the flat-index engines; jump points for JPS) and the path length. The
+octile heuristic aims at the centre of the goal region, so with a region goal the search types
+can settle on slightly different goal cells; toward a single cell their paths are equally short.
+\n
+Before timing, `check_paths` plans on random small grids with every flat-index engine and checks
+each path is connected, free and, toward a single cell, exactly as long as the flat A*'s.
+\n
+A second table replans along the way: the vehicle advances a few meters down its path, and a
+buoy is dropped on the path ahead of it, as ObstacleMap.update_obstacles would add one.
+\n
+ASTAR and JPS also run with HeuristicType.DISTANCE_FIELD ("+FIELD"). Its first plan pays for
+the field; replans reuse it, as buoys are only added.
+"""
+import time
+import numpy as np
+
+from ezauv.map.grid import PathPlanner
+from ezauv.map.grid_objects import CircleGridObject
+from ezauv.map.search import SearchType, HeuristicType, FlatGrid, IncrementalSearch, STRAIGHT, DIAGONAL
+
+
+def scene(size, density, seed=0):
+    """Buoys covering about `density` of a `size` meter square course, clear of the corners."""
+    rng = np.random.default_rng(seed)
+    obstacles = []
+    covered = 0.0
+    while covered < density * size * size:
+        center = rng.uniform(0, size, 2)
+        if np.linalg.norm(center - 2.0) < 4.0 or np.linalg.norm(center - (size - 2.0)) < 4.0:
+            continue
+        radius = rng.uniform(0.3, 1.5)
+        obstacles.append(CircleGridObject(center, radius))
+        covered += np.pi * radius * radius
+    return obstacles
+
+
+def path_length(path):
+    return float(np.sum(np.linalg.norm(np.diff(path.waypoints, axis=0), axis=1)))
+
+
+def path_cost(cells):
+    """The cost of a path of grid cells in the flat engines' integer units, or None if it is not connected."""
+    cost = 0
+    for (y0, x0), (y1, x1) in zip(cells, cells[1:]):
+        dy, dx = abs(y1 - y0), abs(x1 - x0)
+        if max(dy, dx) != 1:
+            return None
+        cost += DIAGONAL if dy and dx else STRAIGHT
+    return cost
+
+
+def check_paths(trials=300, seed=0):
+    """Plan on random grids with every flat-index engine; returns the number of bad paths."""
+    rng = np.random.default_rng(seed)
+    failures = 0
+    for _ in range(trials):
+        h, w = (int(n) for n in rng.integers(3, 40, 2))
+        grid = rng.random((h, w)) < rng.uniform(0.0, 0.45)
+        free = np.argwhere(~grid)
+        if len(free) < 2:
+            continue
+        start, target = (tuple(int(v) for v in cell) for cell in free[rng.choice(len(free), 2)])
+        goal_cells = np.zeros_like(grid)
+        goal_cells[target] = True
+
+        flat = FlatGrid((h, w))
+        blocked = flat.pad(grid, True)
+        goal = flat.pad(goal_cells, False)
+        i = flat.index(*start)
+        expected = flat.astar(blocked, goal, i, flat.octile(*target))
+        # a field over fewer obstacles is still admissible, as when PathPlanner reuses one
+        field = flat.distance_field(flat.pad(grid & (rng.random((h, w)) < 0.5), True), goal)
+        results = [
+            flat.jps(blocked, goal, flat.jump_tables(blocked, goal), i, flat.octile(*target)),
+            IncrementalSearch(flat, goal).plan(blocked, i),
+            flat.astar(blocked, goal, i, field),
+            flat.jps(blocked, goal, flat.jump_tables(blocked, goal), i, field),
+        ]
+        for cells in results:
+            if expected is None or cells is None:
+                failures += (expected is None) != (cells is None)
+            elif cells[0] != start or cells[-1] != target or any(grid[cell] for cell in cells) \
+                    or path_cost(cells) != path_cost(expected):
+                failures += 1
+    return failures
+
+
+def time_plan(planner, start, goal):
+    start_time = time.perf_counter()
+    path, _, _ = planner.find_path(start, goal, smooth=False)
+    return (time.perf_counter() - start_time) * 1e3, path
+
+
+def expanded(planner, search_type):
+    return planner.flat.expanded if search_type != SearchType.HEAP else "-"
+
+
+def replan_script(size, density, resolution, steps, advance=3.0):
+    """
+    The (start, obstacles) of each replan: the vehicle advances `advance` meters down its last
+    path and a buoy is dropped twice as far ahead. Scripted once so every search type sees the
+    same changes.
+    """
+    obstacles = scene(size, density)
+    planner = PathPlanner(((0, 0), (size, size)), resolution, 0.5, obstacles)
+    goal = CircleGridObject(np.array([size - 1.0, size - 1.0]), 0.5)
+    _, path = time_plan(planner, (1.0, 1.0), goal)
+
+    script = [((1.0, 1.0), obstacles)]
+    ahead = int(advance / resolution)
+    for _ in range(steps):
+        if path is None or len(path.waypoints) < 3 * ahead:
+            break
+        start = path.waypoints[ahead]
+        obstacles = obstacles + [CircleGridObject(path.waypoints[2 * ahead], 0.5)]
+        planner.set_objects(obstacles)
+        _, path = time_plan(planner, start, goal)
+        script.append((start, obstacles))
+    return script, goal
+
+
+def configurations(search_types, heuristic_types):
+    """(label, search type, PathPlanner options) for each search type and heuristic it takes."""
+    for search_type in search_types:
+        takes_heuristic = search_type in (SearchType.ASTAR, SearchType.JPS)
+        for heuristic_type in heuristic_types if takes_heuristic else (HeuristicType.OCTILE,):
+            label = search_type.name if heuristic_type == HeuristicType.OCTILE else f"{search_type.name}+FIELD"
+            yield label, search_type, {"search_type": search_type, "heuristic_type": heuristic_type}
+
+
+def time_replans(size, script, goal, resolution, search_type, options):
+    """Mean ms and cells expanded per replan after the first plan, and the last path's length."""
+    (start, obstacles), *replans = script
+    planner = PathPlanner(((0, 0), (size, size)), resolution, 0.5, obstacles, **options)
+    time_plan(planner, start, goal)
+
+    times = []
+    counts = []
+    for start, obstacles in replans:
+        planner.set_objects(obstacles)
+        elapsed, path = time_plan(planner, start, goal)
+        times.append(elapsed)
+        counts.append(expanded(planner, search_type))
+    mean_expanded = f"{np.mean(counts):.0f}" if search_type != SearchType.HEAP else "-"
+    return np.mean(times), mean_expanded, path_length(path)
+
+
+def run(sizes=(20, 50, 100), densities=(0.0, 0.1, 0.25), resolution=0.1, search_types=tuple(SearchType),
+        heuristic_types=tuple(HeuristicType), repeats=3, replan_steps=8):
+    print(f"bad paths on random grids: {check_paths()}\n")
+
+    print(f"{'size m':>7}{'cells':>9}{'density':>9}  {'search':<14}{'ms':>10}{'expanded':>10}{'length m':>10}")
+    for size in sizes:
+        for density in densities:
+            obstacles = scene(size, density)
+            start = (1.0, 1.0)
+            goal = CircleGridObject(np.array([size - 1.0, size - 1.0]), 0.5)
+            for label, search_type, options in configurations(search_types, heuristic_types):
+                elapsed = 0.0
+                for _ in range(repeats):
+                    planner = PathPlanner(((0, 0), (size, size)), resolution, 0.5, obstacles, **options)
+                    plan_time, path = time_plan(planner, start, goal)
+                    elapsed += plan_time / repeats
+                print(f"{size:>7}{planner.grid.size:>9}{density:>9.2f}  {label:<14}{elapsed:>10.1f}"
+                      f"{expanded(planner, search_type):>10}{path_length(path):>10.2f}")
+
+    print(f"\nreplanning, up to {replan_steps} steps")
+    print(f"{'size m':>7}{'density':>9}  {'search':<14}{'ms':>10}{'expanded':>10}{'length m':>10}")
+    for size in sizes:
+        for density in densities:
+            script, goal = replan_script(size, density, resolution, replan_steps)
+            for label, search_type, options in configurations(search_types, heuristic_types):
+                elapsed, count, length = time_replans(size, script, goal, resolution, search_type, options)
+                print(f"{size:>7}{density:>9.2f}  {label:<14}{elapsed:>10.1f}{count:>10}{length:>10.2f}")
+
+
+if __name__ == "__main__":
+    run()
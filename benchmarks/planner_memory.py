@@ -0,0 +1,67 @@
+"""
+Cost of handing a planned path, and the grid it was planned on, from the planner process back.
+
+Run with `python -m ezauv.benchmarks.planner_memory`. Compares pickling what PathManager used to
+put on its result queue (the Path, and with debug pixels, lists of obstacle and goal cell
+centers) against writing and reading the waypoints and grid layers through PlannerMemory. Both
+are timed within one process, so the queue's pipe and feeder thread come on top of the pickled
+numbers.
+"""
+import pickle
+import time
+import numpy as np
+
+from ezauv.map.grid import PathPlanner
+from ezauv.map.grid_objects import CircleGridObject
+from ezauv.map.path import Path
+from ezauv.map.planner_memory import PlannerMemory
+from ezauv.benchmarks.planner import scene
+
+
+def time_call(call, repeats):
+    call()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        call()
+    return (time.perf_counter() - start) / repeats * 1e3
+
+
+def run(sizes=(20, 50, 100), density=0.1, resolution=0.1, repeats=20):
+    print(f"{'size m':>7}{'waypoints':>11}  {'pickled ms':>11}{'shared ms':>11}"
+          f"{'pickled + pixels ms':>21}{'shared + grid ms':>18}")
+    for size in sizes:
+        planner = PathPlanner(((0, 0), (size, size)), resolution, 0.5, scene(size, density))
+        goal = CircleGridObject(np.array([size - 1.0, size - 1.0]), 0.5)
+        path, _, _ = planner.find_path((1.0, 1.0), goal, smooth=False)
+
+        ys, xs = np.nonzero(planner.grid)
+        obstacle_pixels = [planner.grid_to_world((y, x)) for y, x in zip(ys, xs)]
+        goal_rows, goal_cols, goal_mask = planner.last_goal_window
+        gys, gxs = np.nonzero(goal_mask)
+        goal_pixels = [planner.grid_to_world((y + goal_rows.start, x + goal_cols.start)) for y, x in zip(gys, gxs)]
+
+        memory = PlannerMemory(planner.shape)
+        try:
+            def pickled():
+                return pickle.loads(pickle.dumps((path, 0, None, None)))
+
+            def pickled_pixels():
+                return pickle.loads(pickle.dumps((path, 0, obstacle_pixels, goal_pixels)))
+
+            def shared():
+                memory.publish_path(0, path.waypoints)
+                return Path(memory.read_paths()[0][1])
+
+            def shared_grid():
+                memory.publish_grid(planner.last_grid, planner.last_goal_window, 0)
+                memory.publish_path(0, path.waypoints)
+                return Path(memory.read_paths()[0][1]), memory.read_grid()
+
+            times = [time_call(call, repeats) for call in (pickled, shared, pickled_pixels, shared_grid)]
+        finally:
+            memory.close()
+        print(f"{size:>7}{len(path.waypoints):>11}  {times[0]:>11.3f}{times[1]:>11.3f}{times[2]:>21.2f}{times[3]:>18.2f}")
+
+
+if __name__ == "__main__":
+    run()
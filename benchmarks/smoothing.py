@@ -0,0 +1,81 @@
+"""
+Cost of smoothing planned paths.
+
+Run with `python -m ezauv.benchmarks.smoothing`. Plans across courses of increasing size, then
+compares the smoothing `find_path` used to do (from each waypoint, try every later one from the
+end back with a Python Bresenham line check) against `PathPlanner.smooth_cells`, with sharp
+corners and with corners rounded to a turn radius. Reports the time and the resulting length.
+"""
+import time
+import numpy as np
+
+from ezauv.map.grid import PathPlanner
+from ezauv.map.grid_objects import CircleGridObject
+from ezauv.map.path import Path
+from ezauv.benchmarks.planner import scene
+
+
+def bresenham_free(start, end, grid):
+    (y0, x0), (y1, x1) = start, end
+    dx, dy = abs(x1 - x0), abs(y1 - y0)
+    sx = 1 if x0 < x1 else -1
+    sy = 1 if y0 < y1 else -1
+    err = dx - dy
+    while True:
+        if grid[y0, x0]:
+            return False
+        if (x0, y0) == (x1, y1):
+            return True
+        err2 = err * 2
+        if err2 > -dy:
+            err -= dy
+            x0 += sx
+        if err2 < dx:
+            err += dx
+            y0 += sy
+
+
+def greedy_smooth(planner, cells, grid):
+    cells = [tuple(cell) for cell in cells]
+    smoothed = [cells[0]]
+    i = 0
+    while i < len(cells) - 1:
+        j = len(cells) - 1
+        while j > i + 1:
+            if bresenham_free(cells[i], cells[j], grid):
+                break
+            j -= 1
+        smoothed.append(cells[j])
+        i = j
+    return Path([planner.grid_to_world(cell) for cell in smoothed])
+
+
+def time_call(call, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = call()
+    return (time.perf_counter() - start) / repeats * 1e3, result
+
+
+def run(sizes=(20, 50, 100), density=0.1, resolution=0.1, turn_radius=1.5, repeats=3):
+    print(f"{'size m':>7}{'cells':>7}  {'greedy ms':>10}{'m':>8}  {'smooth ms':>10}{'m':>8}"
+          f"  {'+ arcs ms':>10}{'m':>8}")
+    for size in sizes:
+        planner = PathPlanner(((0, 0), (size, size)), resolution, 0.5, scene(size, density))
+        goal = CircleGridObject(np.array([size - 1.0, size - 1.0]), 0.5)
+        raw, _, _ = planner.find_path((1.0, 1.0), goal, smooth=False)
+        cells = np.array([planner.world_to_grid(p) for p in raw.waypoints])
+        grid = planner.grid
+
+        greedy_ms, greedy = time_call(lambda: greedy_smooth(planner, cells, grid), repeats)
+        planner.turn_radius = 0.0
+        sharp_ms, sharp = time_call(lambda: planner.smooth_cells(cells, grid), repeats)
+        planner.turn_radius = turn_radius
+        arcs_ms, arcs = time_call(lambda: planner.smooth_cells(cells, grid), repeats)
+
+        print(f"{size:>7}{len(cells):>7}  {greedy_ms:>10.1f}{greedy.total_length:>8.2f}"
+              f"  {sharp_ms:>10.2f}{sharp.total_length:>8.2f}  {arcs_ms:>10.2f}{arcs.total_length:>8.2f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,299 @@
+import heapq
+import math
+import numpy as np
+
+
+class ActiveSetAllocator:
+    """
+    Deadzone-aware motor allocation without a MIQP solver.
+
+    Every motor is either off, thrusting forward past its deadzone, or thrusting in reverse past
+    it. With those modes fixed the problem is a few small box-constrained least squares problems,
+    solved here with a primal active-set method. A best-first branch-and-bound over the modes
+    finds the best assignment; it is warm started from the previous tick's modes and active set,
+    which are usually still optimal at 100 Hz, so most ticks only solve a handful of QPs. The
+    search stops after `max_nodes` QPs with the best assignment it has found, so the work per
+    call is bounded and the result only depends on the inputs.
+    \n
+    The objective is the gurobi OFFSET model's, and is solved the same way, in stages: first
+    minimize the acceleration error, then the motor effort among the commands with that error.
+    Locked to yaw, OFFSET pins the roll and pitch error to 0; here, a first stage minimizes the
+    roll and pitch error, and an assignment that can't bring it to 0 is infeasible. Each stage
+    keeps the rows of the stages before it at the values they reached, as equality constraints,
+    and takes its steps in the null space of those.
+    """
+    OFF = 0
+    FORWARD = 1
+    REVERSE = -1
+    UNDECIDED = 2
+
+    LOCKED_ROWS = [3, 4]  # roll and pitch, held exactly when locked to yaw
+
+    def __init__(self, M, bounds, deadzones, max_nodes: int = 24, gap: float = 1e-9, tol: float = 1e-9, eq_tol: float = 1e-6):
+        """
+        Two assignments whose error (or effort) differ by less than the relative `gap` are
+        treated as equally good. `eq_tol` is how far the roll and pitch may miss when locked
+        to yaw. `max_nodes` caps the QPs solved per call; when it is hit, the best assignment
+        found so far is returned and `truncated` is set.
+        """
+        self.M = np.asarray(M, dtype=float)
+        self.m, self.n = self.M.shape
+        self.max_nodes = max_nodes
+        self.gap = gap
+        self.tol = tol
+        self.eq_tol = eq_tol
+
+        self.lo = np.array([b[0] for b in bounds], dtype=float)
+        self.hi = np.array([b[1] for b in bounds], dtype=float)
+        self.dz_lo = np.array([min(d[0], 0.0) for d in deadzones], dtype=float)
+        self.dz_hi = np.array([max(d[1], 0.0) for d in deadzones], dtype=float)
+
+        # box of each mode, indexed by mode + 1 (REVERSE, OFF, FORWARD), and the relaxed hull
+        self.mode_lo = np.stack([self.lo, np.zeros(self.n), np.maximum(self.dz_hi, 0.0)])
+        self.mode_hi = np.stack([np.minimum(self.dz_lo, 0.0), np.zeros(self.n), self.hi])
+        self.mode_ok = self.mode_lo <= self.mode_hi
+        self.relaxed_lo = np.minimum(self.lo, 0.0)
+        self.relaxed_hi = np.maximum(self.hi, 0.0)
+
+        # the stages of each problem: (rows of M, or None for the effort, A, the equality
+        # constraints from the stages before, whether it has to reach 0, solvers cached by free set)
+        self._stages = {}
+        for lock_to_yaw in (False, True):
+            groups = [np.arange(self.m)]
+            if lock_to_yaw:
+                groups = [np.array(self.LOCKED_ROWS), np.setdiff1d(np.arange(self.m), self.LOCKED_ROWS)]
+            stages = []
+            for k, rows in enumerate(groups + [None]):
+                A = self.M[rows] if rows is not None else np.eye(self.n)
+                E = self.M[np.concatenate(groups[:k])] if k else None
+                stages.append((rows, A, E, lock_to_yaw and k == 0, {}))
+            self._stages[lock_to_yaw] = stages
+
+        self._no_effort = np.zeros(self.n)
+
+        self.modes = np.full(self.n, self.OFF)
+        self.state = np.zeros(self.n, dtype=int)
+        self.x = np.zeros(self.n)
+
+        self.nodes = 0  # QPs solved by the last call, for benchmarking
+        self.truncated = False  # whether the last call stopped at max_nodes before proving its result best
+
+    def _boxes(self, modes):
+        lo = self.relaxed_lo.copy()
+        hi = self.relaxed_hi.copy()
+        decided = modes != self.UNDECIDED
+        idx = modes[decided] + 1
+        lo[decided] = self.mode_lo[idx, np.flatnonzero(decided)]
+        hi[decided] = self.mode_hi[idx, np.flatnonzero(decided)]
+        return lo, hi
+
+    def _factor(self, A, E, free):
+        """
+        For the free columns: their indices, the least squares step over them for a residual,
+        kept in the directions that leave E x fixed, and the pseudoinverse of E's free columns
+        transposed, for the multipliers.
+        """
+        free_idx = np.flatnonzero(free)
+        A_free = A[:, free_idx]
+        if E is None:
+            return free_idx, np.linalg.pinv(A_free), None
+        E_free = E[:, free_idx]
+        _, s, vt = np.linalg.svd(E_free)
+        rank = int(np.sum(s > 1e-10 * max(s[0], 1.0))) if len(s) else 0
+        N = vt[rank:].T
+        # steps are taken in the null space directly, so the solver maps a residual to one
+        return free_idx, N @ np.linalg.pinv(A_free @ N), np.linalg.pinv(E_free.T)
+
+    def _box_qp(self, A, b, E, lo, hi, x0, state0, solvers):
+        """
+        Minimize 0.5 |Ax - b|^2 subject to lo <= x <= hi, and to E x staying where it is at `x0`
+        if E is given, with a primal active-set method. Without E it starts from the working set
+        `state0` (-1 at lower bound, 1 at upper bound, 0 free); with E, `x0` has to be feasible,
+        and every motor starts free. `solvers` caches `_factor` for each free set.
+        """
+        fixed = lo >= hi
+        x = np.clip(x0, lo, hi)
+        if E is None:
+            state = state0.copy()
+            state[fixed] = -1
+            at_lo = state == -1
+            at_hi = state == 1
+            x[at_lo] = lo[at_lo]
+            x[at_hi] = hi[at_hi]
+        else:
+            state = np.where(fixed, -1, 0)
+
+        # the fixed motors, and bounds added without a step; those are not released again until
+        # the point moves, so a degenerate vertex can't cycle
+        held = fixed.copy()
+        for _ in range(4 * self.n + 8):
+            free = state == 0
+            if free.any():
+                key = free.tobytes()
+                factors = solvers.get(key)
+                if factors is None:
+                    factors = solvers[key] = self._factor(A, E, free)
+                free_idx, solver, _ = factors
+                step = solver @ (b - A @ x)
+                x_free = x[free_idx]
+
+                movable = np.abs(step) > self.tol
+                ratios = np.divide(np.where(step < 0, lo[free_idx], hi[free_idx]) - x_free, step,
+                                   out=np.full(len(step), np.inf), where=movable)
+                j = int(np.argmin(ratios))
+                if ratios[j] < 1.0:
+                    t = max(ratios[j], 0.0)
+                    x[free_idx] = x_free + t * step
+                    i = free_idx[j]
+                    state[i] = -1 if step[j] < 0 else 1
+                    x[i] = lo[i] if step[j] < 0 else hi[i]
+                    if t > 0.0:
+                        held[:] = fixed
+                    else:
+                        held[i] = True
+                    continue
+                x[free_idx] = x_free + step
+                if movable.any():
+                    held[:] = fixed
+
+            gradient = A.T @ (A @ x - b)
+            if E is not None and free.any():
+                # the multipliers of E that leave no gradient on the free columns
+                gradient -= E.T @ (factors[2] @ gradient[free_idx])
+            violation = state * gradient  # how much moving off each bound would lower the cost
+            violation[held] = 0.0
+            release = violation > self.tol
+            if not release.any():
+                break
+            # the multipliers of E are not unique while its free columns don't span its rows, and
+            # a motor released for them may not be able to move; so all go at once
+            if E is None:
+                release = np.argmax(violation)
+            state[release] = 0
+
+        return x, state
+
+    def _compare(self, a, b) -> int:
+        """-1, 0 or 1 as the stage values `a` are below, level with or above `b`, taken in order."""
+        for x, y in zip(a, b):
+            slack = self.tol
+            if math.isfinite(x) and math.isfinite(y):
+                slack += self.gap * max(abs(x), abs(y))
+            if x < y - slack:
+                return -1
+            if x > y + slack:
+                return 1
+        return 0
+
+    def _solve(self, stages, V, lo, hi, x0, state0, best, modes):
+        """
+        Solve the stages in turn over the box of `modes`. Returns x, the working set of the first
+        stage, and each stage's 0.5 |Ax - b|^2, or None for the values if they can't beat `best`
+        or the locked rows can't be met. If the error stages leave a motor in a deadzone and
+        beat `best` outright, the effort is not solved for: the node is branched on anyway, and
+        its error alone bounds its children.
+        """
+        x, state = self._box_qp(stages[0][1], V[stages[0][0]], None, lo, hi, x0, state0, stages[0][4])
+        values = []
+        order = 0
+        for k, (rows, A, E, exact, solvers) in enumerate(stages):
+            if rows is None and order < 0 and self._violations(x, modes).any():
+                break
+            b = V[rows] if rows is not None else self._no_effort
+            if k:
+                x, _ = self._box_qp(A, b, E, lo, hi, x, None, solvers)
+            residual = A @ x - b
+            values.append(0.5 * residual @ residual)
+            order = self._compare(values, best)
+            if order > 0 or order == 0 and len(values) == len(stages):
+                return x, state, None
+            if exact and residual @ residual > self.eq_tol**2:
+                return x, state, None
+        return x, state, tuple(values)
+
+    def _violations(self, x, modes):
+        """How far each undecided motor sits inside its deadzone (0 if it is feasible)."""
+        inside = (modes == self.UNDECIDED) & (x > self.dz_lo + self.tol) & (x < self.dz_hi - self.tol) \
+            & (np.abs(x) > self.tol)
+        return np.where(inside, np.abs(x), 0.0)
+
+    def _modes_of(self, x, modes):
+        """The mode each motor ended up in, for a feasible solution."""
+        found = np.where(np.abs(x) <= self.tol, self.OFF, np.sign(x)).astype(int)
+        decided = modes != self.UNDECIDED
+        found[decided] = modes[decided]
+        return found
+
+    def _rounded(self, x, modes):
+        """`modes` with each undecided motor on in the direction of its command in `x`, or off at 0."""
+        found = np.where(x > self.tol, self.FORWARD, np.where(x < -self.tol, self.REVERSE, self.OFF))
+        found = np.where(self.mode_ok[found + 1, np.arange(self.n)], found, self.OFF)
+        decided = modes != self.UNDECIDED
+        found[decided] = modes[decided]
+        return found
+
+    def optimize(self, V, lock_to_yaw=False):
+        stages = self._stages[bool(lock_to_yaw)]
+        V = np.asarray(V, dtype=float)
+        complete = len(stages)
+
+        # warm start: the previous tick's assignment is usually still the best
+        best_values = (np.inf,) * complete
+        best_x = best_state = best_modes = None
+        lo, hi = self._boxes(self.modes)
+        x, state, values = self._solve(stages, V, lo, hi, self.x, self.state, best_values, self.modes)
+        self.nodes = 1
+        if values is not None:
+            best_x, best_state, best_values, best_modes = x, state, values, self.modes.copy()
+
+        # best-first over the modes, ordered by the parent's relaxation
+        root = np.full(self.n, self.UNDECIDED)
+        frontier = [((-np.inf,), 0, root, x, state)]
+        pushed = 1
+        self.truncated = False
+        while frontier:
+            if self.nodes >= self.max_nodes:
+                self.truncated = True
+                # the incumbent may still be a poor warm start, eg. on the first tick; also try the
+                # most promising open branch with its undecided motors on in the direction they pushed
+                _, _, modes, x0, state0 = frontier[0]
+                rounded = self._rounded(x0, modes)
+                lo, hi = self._boxes(rounded)
+                x, state, values = self._solve(stages, V, lo, hi, x0, state0, best_values, rounded)
+                self.nodes += 1
+                if values is not None:
+                    best_x, best_state, best_values, best_modes = x, state, values, rounded
+                break
+            bound, _, modes, x0, state0 = heapq.heappop(frontier)
+            # a bound without the effort can still win on it when the errors tie
+            order = self._compare(bound, best_values)
+            if order > 0 or order == 0 and len(bound) == complete:
+                continue
+            lo, hi = self._boxes(modes)
+            x, state, values = self._solve(stages, V, lo, hi, x0, state0, best_values, modes)
+            self.nodes += 1
+            if values is None:
+                continue
+
+            violations = self._violations(x, modes)
+            if not violations.any():
+                best_x, best_state, best_values = x, state, values
+                best_modes = self._modes_of(x, modes)
+                continue
+
+            i = int(np.argmax(violations))
+            for mode in (self.REVERSE, self.OFF, self.FORWARD):
+                if not self.mode_ok[mode + 1, i]:
+                    continue
+                child = modes.copy()
+                child[i] = mode
+                heapq.heappush(frontier, (values, pushed, child, x, state))
+                pushed += 1
+
+        if best_x is None:
+            return False, None  # locked to yaw, and no assignment it tried holds the roll and pitch
+
+        best_x = best_x.copy()
+        best_x[np.abs(best_x) <= self.tol] = 0.0
+        self.modes, self.x, self.state = best_modes, best_x, best_state
+        return True, best_x
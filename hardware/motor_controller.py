@@ -1,7 +1,11 @@
 from typing import List, Callable, Optional
+import math
 import numpy as np
 import time
-from gurobipy import GRB, Model, quicksum
+try:
+    from gurobipy import GRB, Model, quicksum
+except ImportError:  # only needed for OptimizerType.OFFSET
+    GRB = Model = quicksum = None
 from scipy.spatial.transform import Rotation as R
 from abc import ABC, abstractmethod
 from enum import IntEnum
@@ -9,30 +13,64 @@ from enum import IntEnum
 from ezauv.telemetry import TELEMETRY
 from ezauv.utils.logger import LogLevel
 from ezauv import TotalAccelerationState, AccelerationState
+from ezauv.hardware.active_set_allocator import ActiveSetAllocator
 
 
 class OptimizerType(IntEnum):
     """Decides the method used to find the next-best acceleration if the wanted one is infeasible"""
     SCALE = 1
-    OFFSET = 0
+    OFFSET = 0        # MIQP through gurobi
+    ACTIVE_SET = 2    # same objective as OFFSET, solved in NumPy without gurobi
+
+
+class InverseType(IntEnum):
+    """Decides how a motor's thrust is turned back into a motor command through the thrust polynomial"""
+    ROOTS = 0     # solve for the polynomial's roots every tick
+    CACHED = 1    # closed form up to degree 2, otherwise a monotone table built in `reset_optimizer`
 
 
 class DeadzoneOptimizer:
-    def __init__(self, M, bounds, deadzones, next_best: OptimizerType = OptimizerType.SCALE):
+    def __init__(self, M, bounds, deadzones, next_best: OptimizerType = OptimizerType.SCALE, compiled: bool = False):
+        """
+        If `compiled` is set (SCALE only), the per-motor ratio tables are precomputed here and
+        `optimize` runs a fused kernel over preallocated buffers instead of building temporaries.
+        """
         self.M = M
         self.bounds = bounds
         self.deadzones = deadzones
         self.m, self.n = M.shape
 
+        self.scale = next_best == OptimizerType.SCALE
+
+        self.active_set = None
+        if next_best == OptimizerType.ACTIVE_SET:
+            self.active_set = ActiveSetAllocator(M, bounds, deadzones)
+        elif next_best == OptimizerType.OFFSET:
+            self._build_model()
+
+        self.M_pinv = np.linalg.pinv(self.M)
+        self.bounds_lo = np.array([b[0] for b in bounds])
+        self.bounds_hi = np.array([b[1] for b in bounds])
+        self.deadzone_mag = np.array([
+            max(abs(d[0]), abs(d[1])) for d in deadzones
+        ])
+
+        self.compiled = compiled
+        if self.compiled:
+            if not self.scale:
+                raise ValueError("Compiled allocation is only available with OptimizerType.SCALE")
+            self._compile()
+
+    def _build_model(self):
+        """Build the gurobi MIQP used by OptimizerType.OFFSET."""
+        if Model is None:
+            raise ImportError("OptimizerType.OFFSET requires gurobipy; use OptimizerType.ACTIVE_SET instead")
+        bounds = self.bounds
+
         self.model = Model("MIQP_deadzone")
         self.model.Params.OutputFlag = 0
 
-        self.scale = bool(next_best)
-
-        if self.scale:
-            self.eps = self.model.addVar(lb=0.0, vtype=GRB.CONTINUOUS, name="eps")
-        else:
-            self.eps = self.model.addVars(self.m, lb=-GRB.INFINITY, vtype=GRB.CONTINUOUS, name="eps")
+        self.eps = self.model.addVars(self.m, lb=-GRB.INFINITY, vtype=GRB.CONTINUOUS, name="eps")
 
         self.u = {}
         for i in range(self.n):
@@ -60,29 +98,72 @@ class DeadzoneOptimizer:
 
         self.constrs = []
         for j in range(self.m):
-            if self.scale:
-                expr = quicksum(self.M[j, i] * self.u[i] for i in range(self.n)) \
-                       + 0.0 * self.eps
-            else:
-                expr = quicksum(self.M[j, i] * self.u[i] for i in range(self.n)) + self.eps[j]
+            expr = quicksum(self.M[j, i] * self.u[i] for i in range(self.n)) + self.eps[j]
             self.constrs.append(self.model.addConstr(expr == 0, name=f"eq_row_{j}"))
 
-        if self.scale:
-            self.obj_eps = (self.eps - 1) * (self.eps - 1)
-        else:
-            self.obj_eps = quicksum(self.eps[j] * self.eps[j] for j in range(self.m))
+        self.obj_eps = quicksum(self.eps[j] * self.eps[j] for j in range(self.m))
         self.obj_u = quicksum(self.u[i] * self.u[i] for i in range(self.n))
 
         self.model.update()
-        self.M_pinv = np.linalg.pinv(self.M)
-        self.bounds_lo = np.array([b[0] for b in bounds])
-        self.bounds_hi = np.array([b[1] for b in bounds])
-        self.deadzone_mag = np.array([
-            max(abs(d[0]), abs(d[1])) for d in deadzones
-        ])
 
+    def _compile(self):
+        """
+        Precompute the per-motor tables used by the compiled SCALE kernel. With only a handful
+        of motors, scalar math over these tuples is much cheaper than a chain of NumPy calls.
+        """
+        with np.errstate(divide="ignore"):
+            inv_hi = 1.0 / self.bounds_hi  # hi / |u| == 1 / (|u| * inv_hi)
+        self._table = tuple(zip(
+            (tuple(row) for row in self.M_pinv.tolist()),
+            self.bounds_lo.tolist(),
+            self.bounds_hi.tolist(),
+            inv_hi.tolist(),
+            self.deadzone_mag.tolist(),
+        ))
+        self._u = np.zeros(self.n)
+
+    def _optimize_compiled(self, V, eps_tol):
+        """
+        Fused SCALE kernel; gives the same result as the uncompiled path without building
+        temporary arrays. The returned array is a work buffer and is overwritten by the next call.
+        """
+        v = V.tolist() if isinstance(V, np.ndarray) else list(V)
+
+        wanted = []
+        hi_ratio = 1.0  # largest |u| / hi over the active motors, at least 1
+        eps_min = 0.0   # largest deadzone / |u| over the active motors
+        for row, _, _, inv_hi, deadzone in self._table:
+            u = 0.0
+            for p, x in zip(row, v):
+                u += p * x
+            wanted.append(u)
+
+            a = u if u >= 0.0 else -u
+            if a > eps_tol:
+                ratio = a * inv_hi
+                if ratio > hi_ratio:
+                    hi_ratio = ratio
+                ratio = deadzone / a
+                if ratio > eps_min:
+                    eps_min = ratio
+
+        eps = 1.0 / hi_ratio
+        if eps_min > eps:
+            eps = 0.0
+
+        out = []
+        for u, (_, lo, hi, _, _) in zip(wanted, self._table):
+            u *= eps
+            u = lo if u < lo else hi if u > hi else u
+            out.append(u if u >= eps_tol or u <= -eps_tol else 0.0)
+
+        self._u[:] = out
+        return True, self._u
 
     def optimize(self, V, lock_to_yaw=False, eps_tol=1e-6):
+        if self.compiled:
+            return self._optimize_compiled(V, eps_tol)
+
         if self.scale:
             u_des = self.M_pinv @ V
             abs_u = np.abs(u_des)
@@ -119,40 +200,75 @@ class DeadzoneOptimizer:
 
             return True, u
 
+        if self.active_set is not None:
+            return self.active_set.optimize(V, lock_to_yaw)
+
         for j in range(self.m):
             self.constrs[j].setAttr(GRB.Attr.RHS, V[j])
 
-            if lock_to_yaw:
-                self.eps[3].LB = 0
-                self.eps[3].UB = 0
-                self.eps[4].LB = 0
-                self.eps[4].UB = 0
+        if lock_to_yaw:
+            self.eps[3].LB = 0
+            self.eps[3].UB = 0
+            self.eps[4].LB = 0
+            self.eps[4].UB = 0
 
-            self.model.setObjective(self.obj_eps, GRB.MINIMIZE)
-            self.model.optimize()
+        self.model.setObjective(self.obj_eps, GRB.MINIMIZE)
+        self.model.optimize()
 
-            if self.model.status != GRB.OPTIMAL:
-                return False, None
+        if self.model.status != GRB.OPTIMAL:
+            return False, None
 
-            for j in range(self.m):
-                val = self.eps[j].X
-                self.eps[j].LB = val
-                self.eps[j].UB = val
+        for j in range(self.m):
+            val = self.eps[j].X
+            self.eps[j].LB = val
+            self.eps[j].UB = val
 
-            self.model.setObjective(self.obj_u, GRB.MINIMIZE)
-            self.model.optimize()
+        self.model.setObjective(self.obj_u, GRB.MINIMIZE)
+        self.model.optimize()
 
-            for j in range(self.m):
-                self.eps[j].LB = -GRB.INFINITY
-                self.eps[j].UB = GRB.INFINITY
+        for j in range(self.m):
+            self.eps[j].LB = -GRB.INFINITY
+            self.eps[j].UB = GRB.INFINITY
 
-            if self.model.status == GRB.OPTIMAL:
-                return True, np.array([self.u[i].X for i in range(self.n)])
+        if self.model.status == GRB.OPTIMAL:
+            return True, np.array([self.u[i].X for i in range(self.n)])
 
-            return False, None
+        return False, None
+
+
+
+
+
+    def optimize_batch(self, V, lock_to_yaw=False, eps_tol=1e-6):
+        """
+        Run `optimize` on every row of V ([N, 6]). SCALE is vectorized across rows; the other modes
+        are solved row by row. Returns ([N] success flags, [N, n] outputs); failed rows are NaN.
+        """
+        V = np.atleast_2d(np.asarray(V, dtype=float))
+        N = V.shape[0]
+
+        if not self.scale:
+            ok = np.zeros(N, dtype=bool)
+            U = np.full((N, self.n), np.nan)
+            for k, row in enumerate(V):
+                ok[k], u = self.optimize(row, lock_to_yaw, eps_tol)
+                if ok[k]:
+                    U[k] = u
+            return ok, U
 
+        U = V @ self.M_pinv.T
+        abs_U = np.abs(U)
+        mask = abs_U > eps_tol
 
+        with np.errstate(divide="ignore", invalid="ignore"):
+            eps_max = np.minimum(1.0, np.where(mask, self.bounds_hi / abs_U, np.inf).min(axis=1))
+            eps_min = np.where(mask, self.deadzone_mag / abs_U, 0.0).max(axis=1)
+        eps = np.where(eps_min <= eps_max, eps_max, 0.0)
 
+        U = np.clip(eps[:, None] * U, self.bounds_lo, self.bounds_hi)
+        U[np.abs(U) < eps_tol] = 0.0
+        U[~mask.any(axis=1)] = 0.0
+        return np.ones(N, dtype=bool), U
 
 
 class Motor:
@@ -190,7 +306,19 @@ class Motor:
         pass
 
 class MotorController:
-    def __init__(self, *, inertia: np.ndarray, motors: List[Motor], coefficients=[0, 1], motor_function: Callable = None):
+    INVERSE_TABLE_SIZE = 4097  # samples of the thrust polynomial in the InverseType.CACHED table
+
+    def __init__(self, *, inertia: np.ndarray, motors: List[Motor], coefficients=[0, 1], motor_function: Callable = None, compiled_allocation: bool = False, optimizer_type: OptimizerType = OptimizerType.SCALE, inverse_type: InverseType = InverseType.ROOTS):
+        """
+        If `compiled_allocation` is set, the allocator precomputes its tables in `reset_optimizer`
+        and runs a fused, allocation-free kernel every tick.
+        \n
+        `optimizer_type` decides how the next-best acceleration is found; see `OptimizerType`.
+        \n
+        `inverse_type` decides how thrusts are mapped back to motor commands; see `InverseType`.
+        CACHED falls back to ROOTS, with a warning, if the polynomial is not monotone over the
+        motors' bounds.
+        """
         self.inv_inertia: np.ndarray = np.linalg.inv(inertia)  # the inverse inertia tensor of the entire body
         self.motors: np.ndarray = np.array(motors)  # the list of motors this sub owns
         self.log: Callable = lambda str, level=None: print(
@@ -200,6 +328,11 @@ class MotorController:
         self.polynomial = np.polynomial.Polynomial(coefficients)
 
         self.optimizer: Optional[DeadzoneOptimizer] = None
+        self.compiled_allocation = compiled_allocation
+        self.optimizer_type = optimizer_type
+        self.inverse_type = inverse_type
+        self.cached_inverse = False  # whether InverseType.CACHED is actually in use
+        self.inverse_table = None
 
         self.motor_matrix = None
         self.mT = None
@@ -208,6 +341,10 @@ class MotorController:
 
         self.prev_sent = {}
 
+        # reused by `solve` every tick
+        self._wanted = np.zeros(6)
+        self._yaw_matrix = np.eye(3)
+
     def overview(self) -> None:
         self.log("---Motor controller overview---")
         self.log(f"Inverse inertia tensor:\n{self.inv_inertia}")
@@ -251,9 +388,47 @@ class MotorController:
 
             bounds.append((p(motor.bounds.min), p(motor.bounds.max)))
             deadzones.append((p(motor.deadzone.min), p(motor.deadzone.max)))
-        self.optimizer = DeadzoneOptimizer(self.motor_matrix, bounds, deadzones)
+        self.optimizer = DeadzoneOptimizer(self.motor_matrix, bounds, deadzones, self.optimizer_type, compiled=self.compiled_allocation)
         self.mT = self.motor_matrix.T
 
+        self.bounds_min = np.array([motor.bounds.min for motor in self.motors], dtype=float)
+        self.bounds_max = np.array([motor.bounds.max for motor in self.motors], dtype=float)
+        self.deadzone_min = np.array([motor.deadzone.min for motor in self.motors], dtype=float)
+        self.deadzone_max = np.array([motor.deadzone.max for motor in self.motors], dtype=float)
+
+        # companion matrix of the monic thrust polynomial; only the constant term changes per target
+        coef = np.polynomial.polynomial.polytrim(p.coef)
+        degree = len(coef) - 1
+        self.companion = np.zeros((degree, degree))
+        if degree > 0:
+            self.companion[1:, :-1] = np.eye(degree - 1)
+            self.companion[:, -1] = -coef[:-1] / coef[-1]
+
+        self.inverse_coef = coef
+        self.inverse_table = None
+        self.cached_inverse = self.inverse_type == InverseType.CACHED
+        if self.cached_inverse and degree > 2:
+            self.inverse_table = self._build_inverse_table(p)
+            self.cached_inverse = self.inverse_table is not None
+
+    def _build_inverse_table(self, p):
+        """
+        Sample the thrust polynomial over the motors' whole command range, so that `np.interp`
+        over (thrusts, commands) inverts it. Returns None if it is not monotone there.
+        """
+        commands = np.linspace(min(self.bounds_min.min(), 0.0), max(self.bounds_max.max(), 0.0), self.INVERSE_TABLE_SIZE)
+        thrusts = p(commands)
+        steps = np.diff(thrusts)
+        if (steps < 0).all():
+            thrusts, commands = thrusts[::-1], commands[::-1]
+        elif not (steps > 0).all():
+            self.log(
+                "Thrust polynomial is not monotone over the motor bounds, falling back to InverseType.ROOTS",
+                level=LogLevel.WARNING,
+            )
+            return None
+        return thrusts, commands
+
     def solve(self, mixed_acceleration: TotalAccelerationState, rotation: R, lock_to_yaw: bool = False):
         """
         Find the array of motor speeds needed to travel at a specific thrust vector and rotation.
@@ -266,14 +441,20 @@ class MotorController:
         if isinstance(mixed_acceleration, AccelerationState):
             mixed_acceleration = mixed_acceleration.to_total()
 
+        matrix = rotation.as_matrix()
         if lock_to_yaw:
-            yaw, _, _ = rotation.as_euler('zyx', degrees=False)
-            rotation = R.from_euler('z', yaw, degrees=False)
+            # the extrinsic 'zyx' euler yaw (R = Rx Ry Rz), put into a yaw-only matrix without
+            # building another Rotation
+            yaw = math.atan2(-matrix[0, 1], matrix[0, 0])
+            cos, sin = math.cos(yaw), math.sin(yaw)
+            matrix = self._yaw_matrix
+            matrix[0, 0] = cos
+            matrix[0, 1] = -sin
+            matrix[1, 0] = sin
+            matrix[1, 1] = cos
         # print(mixed_acceleration)
-        acceleration = mixed_acceleration.extract_acceleration(rotation)
-        # print(acceleration)
-        Rx, Ry, Rz = acceleration.rotation
-        rotated_wanted = np.append(acceleration.translation, np.array([Rx, Ry, Rz]))
+        rotated_wanted = mixed_acceleration.extract_into(matrix, self._wanted)
+        Rz = rotated_wanted[5]
 
         # print(rotated_wanted)
         optimized = self.optimizer.optimize(rotated_wanted, lock_to_yaw)
@@ -284,14 +465,17 @@ class MotorController:
         # wanted_unit = rotated_wanted/np.linalg.norm(rotated_wanted)
         # optimized_unit = (self.motor_matrix@optimized[1])/np.linalg.norm(self.motor_matrix@optimized[1])
 
-        motor_controls = []
-        for target in optimized[1]:
-            roots = (self.polynomial - target).roots()
-            # print(self.polynomial)
-            motor_controls.append(
-                min([r.real for r in roots if abs(r.imag) < 1e-8],
-                key=lambda x: abs(x))
-            )
+        if self.cached_inverse:
+            motor_controls = list(self._inverse_cached(optimized[1]))
+        else:
+            motor_controls = []
+            for target in optimized[1]:
+                roots = (self.polynomial - target).roots()
+                # print(self.polynomial)
+                motor_controls.append(
+                    min([r.real for r in roots if abs(r.imag) < 1e-8],
+                    key=lambda x: abs(x))
+                )
         DEBUG = False
         if DEBUG: # debug
             acceleration_angle = np.arctan2(rotated_wanted[1], rotated_wanted[0])
@@ -325,6 +509,90 @@ class MotorController:
         TELEMETRY.submit("accelerations", motor_controls)
         return True, motor_controls
 
+    def _invert_polynomial(self, targets: np.ndarray) -> np.ndarray:
+        """
+        Vectorized inverse of the thrust polynomial: for each target, the real root of
+        `polynomial(x) = target` closest to zero. All the companion matrices are solved in one
+        batched eigenvalue call.
+        """
+        targets = np.asarray(targets, dtype=float)
+        coef = np.polynomial.polynomial.polytrim(self.polynomial.coef)
+        degree = len(coef) - 1
+        if degree < 1:
+            raise ValueError("The thrust polynomial is constant and cannot be inverted")
+
+        companions = np.broadcast_to(self.companion, targets.shape + self.companion.shape).copy()
+        companions[..., 0, -1] = -(coef[0] - targets) / coef[-1]
+        roots = np.linalg.eigvals(companions)
+
+        real = np.abs(roots.imag) < 1e-8
+        if not real.any(axis=-1).all():
+            raise ValueError("Some thrust targets have no real motor command")
+        magnitude = np.where(real, np.abs(roots.real), np.inf)
+        closest = np.argmin(magnitude, axis=-1)
+        return np.take_along_axis(roots.real, closest[..., None], axis=-1)[..., 0]
+
+    def _inverse_cached(self, targets: np.ndarray) -> np.ndarray:
+        """
+        InverseType.CACHED inverse of the thrust polynomial. Degree 1 and 2 are solved in closed
+        form, taking the root closest to zero like `_invert_polynomial`; a quadratic target past the
+        vertex maps to the vertex. Higher degrees read the table from `_build_inverse_table`, so
+        targets outside the motors' range come back at the range's ends.
+        """
+        targets = np.asarray(targets, dtype=float)
+        if self.inverse_table is not None:
+            thrusts, commands = self.inverse_table
+            return np.interp(targets, thrusts, commands)
+
+        coef = self.inverse_coef
+        if len(coef) == 2:
+            return (targets - coef[0]) / coef[1]
+        if len(coef) != 3:
+            raise ValueError("The thrust polynomial is constant and cannot be inverted")
+
+        # a x^2 + b x + c = 0; the smaller root is c / q, which stays accurate when b^2 >> 4ac
+        c, b, a = coef[0] - targets, coef[1], coef[2]
+        sign = 1.0 if b >= 0 else -1.0
+        q = -0.5 * (b + sign * np.sqrt(np.maximum(b * b - 4.0 * a * c, 0.0)))
+        degenerate = q == 0.0  # b = 0 at the vertex, where the root is 0
+        return np.where(degenerate, 0.0, c / np.where(degenerate, 1.0, q))
+
+    def _clamp_controls(self, controls: np.ndarray) -> np.ndarray:
+        """Zero commands inside each motor's deadzone and clamp the rest to its bounds."""
+        in_deadzone = (controls > self.deadzone_min) & (controls < self.deadzone_max)
+        controls = np.clip(controls, self.bounds_min, self.bounds_max)
+        return np.where(in_deadzone, 0.0, controls)
+
+    def solve_batch(self, accelerations: np.ndarray, rotations: R, lock_to_yaw: bool = False, local: bool = False) -> np.ndarray:
+        """
+        Vectorized `solve` for offline use, eg. trajectory evaluation or simulation replays.
+        \n
+        `accelerations` is an [N, 6] array of (Tx, Ty, Tz, Rx, Ry, Rz) in global space, or in local
+        space if `local` is set. `rotations` is either one SciPy rotation or a stack of N.
+        Returns an [N, n_motors] array of motor controls; rows with no solution are NaN.
+        """
+        accelerations = np.atleast_2d(np.asarray(accelerations, dtype=float))
+
+        if local:
+            wanted = accelerations
+        else:
+            if lock_to_yaw:
+                yaw = rotations.as_euler('zyx', degrees=False)[..., :1]
+                rotations = R.from_euler('z', yaw, degrees=False)
+            inverse = rotations.inv()
+            wanted = np.hstack([
+                inverse.apply(accelerations[:, 0:3]).reshape(-1, 3),
+                inverse.apply(accelerations[:, 3:6]).reshape(-1, 3),
+            ])
+
+        ok, thrusts = self.optimizer.optimize_batch(wanted, lock_to_yaw)
+
+        controls = np.full(thrusts.shape, np.nan)
+        if ok.any():
+            inverse = self._inverse_cached if self.cached_inverse else self._invert_polynomial
+            controls[ok] = self._clamp_controls(inverse(thrusts[ok]))
+        return controls
+
     def set_motors(self, motor_speeds):
         """
         Set each motor to a corresponding speed of motor_speeds.
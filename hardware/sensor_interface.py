@@ -1,10 +1,17 @@
 from abc import ABC, abstractmethod
+import threading
+import time
+
+from ezauv.utils.clock import Clock
+from ezauv.utils.logger import LogLevel
 
 # The abstract interface for interacting with the hardware; this should be
 # extended and registered into the auv
 
 
 class Sensor(ABC):
+    rate: float = 100.0  # how often to poll this sensor in threaded mode, in Hz
+
     def __init__(self, log: callable):
         self.log = log
 
@@ -26,27 +33,107 @@ class Sensor(ABC):
         \n
         To provide rotation data, return a SciPy Rotation object under the key "rotation". Global
         rotations will automatically use this value.
+        \n
+        In threaded mode this is called from the sensor's own reader thread, and the returned dict
+        is shared with the control loop, so return new objects rather than mutating old ones.
         """
         pass
 
 
 class SensorInterface:
-    def __init__(self, sensors: list[Sensor]):
+    def __init__(self, sensors: list[Sensor], threaded: bool = False, startup_timeout: float = 5.0):
+        """
+        If `threaded` is set, every sensor is polled on its own reader thread at its `rate`, and
+        `get_data` returns the latest sample of each without waiting on any device. Otherwise
+        each sensor is read in turn on every `get_data` call.
+        \n
+        Either way, the returned data also has "time", the clock time of the call, and per data
+        key the "sensor_timestamps" it was read at and the "sensor_ages" since then.
+        `startup_timeout` is how long `initialize` waits for the first sample of every sensor.
+        """
         self.sensors: list[Sensor] = sensors
-        self.log = lambda str: print(str)
+        self.log = lambda str, level=None: print(str)
+        self.clock = Clock()
+
+        self.threaded = threaded
+        self.startup_timeout = startup_timeout
+
+        # latest (timestamp, data) of each sensor; replaced whole by its reader, so no lock is needed
+        self._latest: list = [None] * len(sensors)
+        self._readers: list[threading.Thread] = []
+        self._stop = threading.Event()
 
     def initialize(self) -> None:
         for sensor in self.sensors:
             sensor.log = self.log
             sensor.initialize()
 
+        if self.threaded:
+            self._start_readers()
+
     def overview(self) -> None:
         for sensor in self.sensors:
             sensor.overview()
 
+    def _read(self, index: int) -> None:
+        sensor = self.sensors[index]
+        period = 1 / sensor.rate
+        # paced in real time, as the wait sleeps; the clock may be simulated, and only stamps samples
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                data = sensor.get_data()
+                self._latest[index] = (self.clock.perf_counter(), data)
+            except Exception as e:
+                self.log(f"Reading {type(sensor).__name__} failed: {e!r}", level=LogLevel.ERROR)
+
+            deadline = max(deadline + period, time.monotonic())
+            self._stop.wait(deadline - time.monotonic())
+
+    def _start_readers(self) -> None:
+        self._stop.clear()
+        self._readers = [
+            threading.Thread(target=self._read, args=(i,), name=f"sensor-{type(sensor).__name__}", daemon=True)
+            for i, sensor in enumerate(self.sensors)
+        ]
+        for reader in self._readers:
+            reader.start()
+
+        timeout = time.monotonic() + self.startup_timeout
+        while any(sample is None for sample in self._latest) and time.monotonic() < timeout:
+            self._stop.wait(0.001)
+
+        for sensor, sample in zip(self.sensors, self._latest):
+            if sample is None:
+                self.log(f"No data from {type(sensor).__name__} after {self.startup_timeout}s", level=LogLevel.WARNING)
+
     def get_data(self) -> dict[str, object]:
+        if self.threaded:
+            samples = list(self._latest)
+        else:
+            samples = []
+            for sensor in self.sensors:
+                data = sensor.get_data()
+                samples.append((self.clock.perf_counter(), data))
+
+        now = self.clock.perf_counter()
         data = {}
-        for sensor in self.sensors:
-            data.update(sensor.get_data())
+        timestamps = {}
+        for sample in samples:
+            if sample is None:
+                continue
+            timestamp, sensor_data = sample
+            data.update(sensor_data)
+            timestamps.update(dict.fromkeys(sensor_data, timestamp))
+
+        data["time"] = now
+        data["sensor_timestamps"] = timestamps
+        data["sensor_ages"] = {key: now - timestamp for key, timestamp in timestamps.items()}
         return data
 
+    def kill(self) -> None:
+        """Stop the reader threads, if any."""
+        self._stop.set()
+        for reader in self._readers:
+            reader.join(timeout=1.0)
+        self._readers = []
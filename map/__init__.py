@@ -2,5 +2,7 @@ from ezauv.map.flat_map import FlatMap
 # from ezauv.map.grid import Grid
 from ezauv.map.grid_objects import GridObject, CircleGridObject, StaticGridObject
 from ezauv.map.path import Path
+from ezauv.map.search import SearchType, HeuristicType
+from ezauv.map.association import AssociationType
 from ezauv.map.obstacle_map import ObstacleMap, Obstacle
 from ezauv.map.map import Map
\ No newline at end of file
@@ -0,0 +1,94 @@
+from enum import IntEnum
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.spatial import cKDTree
+
+# data association for ObstacleMap.update_obstacles: which new detections are sightings of which
+# tracked obstacles. a detection is gated to a tracked obstacle when its far edge is within the
+# tolerance of the tracked one's near edge, ie. distance + detection radius - tracked radius <
+# tolerance. the detections go into a k-d tree, and each tracked obstacle only checks those within
+# the largest distance the gate could pass at, so a frame costs about the number of nearby pairs
+# instead of every pair
+
+
+class AssociationType(IntEnum):
+    """Decides how ObstacleMap matches detections to the obstacles it tracks"""
+    GREEDY = 0     # each tracked obstacle in turn takes every detection it gates, as before
+    HUNGARIAN = 1  # one detection per tracked obstacle, minimizing the total distance; the rest merge into the nearest
+
+
+def associate(tracked_positions, tracked_radii, positions, radii, tolerance: float,
+              association_type: AssociationType = AssociationType.GREEDY) -> list[tuple[int, int]]:
+    """
+    The (tracked index, detection index) pairs to merge, in the order to merge them: averaging
+    the tracked radius with the detection's each time. A detection is in at most one pair.
+    """
+    tracked_positions = np.asarray(tracked_positions, dtype=float).reshape(-1, 2)
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    tracked_radii = np.asarray(tracked_radii, dtype=float)
+    radii = np.asarray(radii, dtype=float)
+    if len(tracked_positions) == 0 or len(positions) == 0:
+        return []
+
+    tree = cKDTree(positions)
+    if association_type == AssociationType.HUNGARIAN:
+        return _hungarian(tree, tracked_positions, tracked_radii, positions, radii, tolerance)
+    return _greedy(tree, tracked_positions, tracked_radii, positions, radii, tolerance)
+
+
+def _gated(tree, tracked_positions, reach):
+    """The detections within `reach` of each tracked obstacle, in index order."""
+    near = tree.query_ball_point(tracked_positions, np.maximum(reach, 0.0))
+    return [sorted(indices) for indices in near]
+
+
+def _greedy(tree, tracked_positions, tracked_radii, positions, radii, tolerance):
+    # a tracked radius only moves toward the detection radii as it merges, so it never passes
+    # the larger of its own and theirs
+    reach = tolerance + np.maximum(tracked_radii, radii.max()) - radii.min()
+    taken = np.zeros(len(positions), dtype=bool)
+    matches = []
+    for i, near in enumerate(_gated(tree, tracked_positions, reach)):
+        radius = tracked_radii[i]
+        for j in near:
+            if taken[j]:
+                continue
+            if np.linalg.norm(positions[j] - tracked_positions[i]) + radii[j] - radius < tolerance:
+                radius = (radius + radii[j]) / 2
+                taken[j] = True
+                matches.append((i, j))
+    return matches
+
+
+def _hungarian(tree, tracked_positions, tracked_radii, positions, radii, tolerance):
+    reach = tolerance + tracked_radii - radii.min()
+    pairs = [(i, j) for i, near in enumerate(_gated(tree, tracked_positions, reach)) for j in near]
+    if not pairs:
+        return []
+    pairs = np.array(pairs)
+    distance = np.linalg.norm(positions[pairs[:, 1]] - tracked_positions[pairs[:, 0]], axis=1)
+    gate = distance + radii[pairs[:, 1]] - tracked_radii[pairs[:, 0]] < tolerance
+    pairs, distance = pairs[gate], distance[gate]
+    if len(pairs) == 0:
+        return []
+
+    # only the obstacles and detections in some gated pair take part; any other pair costs more
+    # than every gated one together, so as many gated pairs as possible are made
+    rows, row_of = np.unique(pairs[:, 0], return_inverse=True)
+    cols, col_of = np.unique(pairs[:, 1], return_inverse=True)
+    unmatched = distance.sum() + 1.0
+    cost = np.full((len(rows), len(cols)), unmatched)
+    cost[row_of, col_of] = distance
+    assigned_rows, assigned_cols = linear_sum_assignment(cost)
+    assigned = cost[assigned_rows, assigned_cols] < unmatched
+    matches = [(int(rows[r]), int(cols[c])) for r, c in zip(assigned_rows[assigned], assigned_cols[assigned])]
+
+    # a detection left over is still a sighting of something tracked, not a new obstacle
+    taken = set(cols[assigned_cols[assigned]])
+    order = np.lexsort((distance, pairs[:, 1]))  # by detection, nearest obstacle first
+    for k in order:
+        i, j = pairs[k]
+        if j not in taken:
+            taken.add(j)
+            matches.append((int(i), int(j)))
+    return matches
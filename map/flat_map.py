@@ -25,6 +25,8 @@ class FlatMap(Map):
         self.sigma_a = sigma_a
         self.sigma_alpha = sigma_alpha
 
+        self.fused_timestamps = {}  # sensor data key -> timestamp of the last sample fused from it
+
     def angle_to(self, heading: float) -> float:
         """Returns the current difference in heading angle to a given global angle."""
         return self.heading - heading
@@ -81,72 +83,19 @@ class FlatMap(Map):
                 sigma_gyro = self.sigma_alpha
             )
 
-        dt = sensor_data.get("dt", None)
-        if dt is None:
-            return
-
-        rotation = sensor_data.get("rotation").inv()
-        local_accel = sensor_data.get("acceleration")
-
-        # print("accel:", rotation.apply(local_accel))
-        if rotation is not None and local_accel is not None:
-            g = np.array([0.0, 0.0, 0.0]) # TODO add gravity to sim
-
-            # body -> world
-            a_world = rotation.apply(local_accel)
-
-            # planar motion only
-            ax, ay = a_world[0], a_world[1]
-
-            self.kf.predict(
-                dt=dt,
-                imu_accel=(ax, ay),
-            )
+        timestamps = sensor_data.get("sensor_timestamps")
+        if timestamps is None:
+            dt = sensor_data.get("dt", None)
+            if dt is None:
+                return
+            self._fuse_untimed(sensor_data, dt)
+            x = self.kf.state()
         else:
-            # print("dt:", dt)
-            self.kf.predict(
-                dt=dt,
-                imu_accel=(0.0, 0.0),
-            )
+            self._fuse_timestamped(sensor_data, timestamps)
+            # report the estimate at the loop's time, not at the newest measurement
+            now = sensor_data.get("time", None)
+            x = self.kf.state() if now is None else self.kf.state_at(now)
 
-        z = []
-        H = []
-
-        position = sensor_data.get("position", None)
-        velocity = sensor_data.get("velocity", None)
-        rotational_velocity = sensor_data.get("gyro", None)
-
-        if position is not None:
-            z.extend([position[0], position[1]])
-            H.extend([
-                [1, 0, 0, 0, 0, 0],
-                [0, 1, 0, 0, 0, 0],
-            ])
-            TELEMETRY.submit("position measurement x", position[0])
-
-        if rotation is not None:
-            theta = sensor_data.get("heading", None)
-            z.append(theta)
-            H.append([0, 0, 1, 0, 0, 0])
-
-        if velocity is not None:
-            linear_vel = velocity["translational"]
-            z.extend([linear_vel[0], linear_vel[1]])
-            H.extend([
-                [0, 0, 0, 1, 0, 0],
-                [0, 0, 0, 0, 1, 0],
-            ])
-        if rotational_velocity is not None:
-            z.append(rotational_velocity)
-            H.append([0, 0, 0, 0, 0, 1])
-        
-        if z:
-            z = np.asarray(z)
-            H = np.asarray(H)
-
-            
-            self.kf.update(z, H)
-        x = self.kf.state()
         # k = np.array([position[0], position[1], theta, velocity["translational"][0], velocity["translational"][1], rotational_velocity])
         # print("Difference: ", np.round(x - k, 6))
         self.position = np.array([x[0], x[1]])
@@ -161,4 +110,87 @@ class FlatMap(Map):
         TELEMETRY.submit("position", self.position)
         TELEMETRY.submit("rotation", self.heading)
         TELEMETRY.submit("velocity", self.velocities)
-        TELEMETRY.submit("position x", self.position[0])
\ No newline at end of file
+        TELEMETRY.submit("position x", self.position[0])
+
+    # the state entries each measured key maps to, in the order they're stacked into z
+    MEASUREMENT_ROWS = {
+        "position": (0, 1),
+        "heading": (2,),
+        "velocity": (3, 4),
+        "gyro": (5,),
+    }
+
+    def _measurement(self, sensor_data, keys):
+        """
+        Stack the measurements under `keys` into z and its cached MeasurementModel, or
+        (None, None) if there are none. Each combination of present sensors gets one model.
+        """
+        z = []
+        rows = []
+        for key in keys:
+            value = sensor_data.get(key, None)
+            if value is None or key not in self.MEASUREMENT_ROWS:
+                continue
+            if key == "position":
+                z.extend([value[0], value[1]])
+                TELEMETRY.submit("position measurement x", value[0])
+            elif key == "velocity":
+                linear_vel = value["translational"]
+                z.extend([linear_vel[0], linear_vel[1]])
+            else:
+                z.append(value)
+            rows.extend(self.MEASUREMENT_ROWS[key])
+
+        if not z:
+            return None, None
+        return np.asarray(z, dtype=float), self.kf.measurement_model(rows)
+
+    def _imu_accel(self, sensor_data):
+        """The planar global acceleration from the IMU, or None without one."""
+        rotation = sensor_data.get("rotation", None)
+        local_accel = sensor_data.get("acceleration", None)
+        if rotation is None or local_accel is None:
+            return None
+        g = np.array([0.0, 0.0, 0.0]) # TODO add gravity to sim
+
+        # body -> world
+        a_world = rotation.inv().apply(local_accel)
+
+        # planar motion only
+        return (a_world[0], a_world[1])
+
+    def _fuse_untimed(self, sensor_data, dt):
+        """Treat every measurement as taken now, `dt` after the last update."""
+        imu_accel = self._imu_accel(sensor_data)
+        self.kf.predict(
+            dt=dt,
+            imu_accel=(0.0, 0.0) if imu_accel is None else imu_accel,
+        )
+
+        keys = [key for key in self.MEASUREMENT_ROWS if key != "heading" or "rotation" in sensor_data]
+        z, H = self._measurement(sensor_data, keys)
+        if z is not None:
+            self.kf.update(z, H)
+
+    def _fuse_timestamped(self, sensor_data, timestamps):
+        """
+        Fuse each measurement at the time it was read, oldest first. A sample already fused (its
+        key's timestamp hasn't moved on) is skipped, so a slow sensor polled by a fast loop is
+        only counted once.
+        """
+        groups = {}  # timestamp -> keys read at it
+        for key in ("acceleration", *self.MEASUREMENT_ROWS):
+            timestamp = timestamps.get(key, None)
+            if timestamp is None or sensor_data.get(key, None) is None:
+                continue
+            if timestamp <= self.fused_timestamps.get(key, -np.inf):
+                continue
+            self.fused_timestamps[key] = timestamp
+            groups.setdefault(timestamp, []).append(key)
+
+        for timestamp in sorted(groups):
+            keys = groups[timestamp]
+            imu_accel = self._imu_accel(sensor_data) if "acceleration" in keys else None
+            z, H = self._measurement(sensor_data, keys)
+            if not self.kf.process(timestamp, imu_accel=imu_accel, z=z, H=H):
+                TELEMETRY.submit("dropped measurements", keys)
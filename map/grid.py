@@ -1,8 +1,13 @@
 import heapq
-from collections import deque
+import itertools
+import math
+from collections import OrderedDict
 import numpy as np
-from ezauv.map.grid_objects import GridObject
+from ezauv.map.grid_objects import GridObject, crop_window, paste_window
 from ezauv.map.path import Path
+from ezauv.map.search import SearchType, HeuristicType, FlatGrid, IncrementalSearch, INF
+from ezauv.map.occupancy import OccupancyLayer, RollingOccupancy
+from ezauv.map.planner_memory import PlannerMemory, BLOCKED, GOAL
 from scipy.ndimage import distance_transform_edt
 from ezauv.simulation.animator import set_goal_pixels, set_obstacle_pixels
 from ezauv.telemetry import TELEMETRY
@@ -14,159 +19,377 @@ import cProfile
 
 
 class PathManager:
-    def __init__(self, dimensions, resolution, radius, obstacles):
-        self.request_q = Queue(maxsize=1)
-        self.obstacle_q = Queue(maxsize=1)
-        self.result_q = Queue(maxsize=1)
-        
-        self.process = Process(
-            target=planner_worker,
-            args=(
-                dimensions,
-                resolution,
-                radius,
-                obstacles,
-                self.request_q,
-                self.obstacle_q,
-                self.result_q,
-            ),
-            daemon=True,
-        )
-        self.process.start()
+    def __init__(self, dimensions, resolution, radius, obstacles, planner_options: dict = None):
+        """
+        Runs PathPlanners in separate processes. `planner_options` are passed on to the
+        PathPlanner as keyword arguments, eg. `{"search_type": SearchType.ASTAR}`, except
+        "workers": the number of planner processes (1 by default), "debug_pixels": if set,
+        `get_path` shows the obstacle and goal cells each new path was planned on, and "profile":
+        if set, each planner process dumps cProfile stats on shutdown, to
+        path_planner_profile.prof for the first and path_planner_profile_<n>.prof for the rest.
+        \n
+        Requests are queued and taken by whichever planner is free, so several goals can be
+        planned at once; each request's ticket collects its own result until it's cancelled.
+        Paths and the planners' grids come back through shared memory (see PlannerMemory)
+        rather than being pickled, apart from paths that don't fit a free result slot.
+        """
+        planner_options = dict(planner_options or {})
+        self.debug_pixels = planner_options.pop("debug_pixels", False)
+        workers = planner_options.pop("workers", 1)
+        profile = planner_options.pop("profile", False)
+        self.resolution = resolution
+        self.origin = np.array(dimensions[0])
+
+        shape = PathPlanner.grid_shape(dimensions, resolution, planner_options.get("window_size"))
+        self.request_q = Queue()  # shared by the planners, each takes the next request when free
+        self.control_qs = [Queue() for _ in range(workers)]  # obstacles, cancellations and shutdown, per planner
+        self.overflow_qs = [Queue() for _ in range(workers)]  # (path id, waypoints) of results that missed a slot
+        self.memories = [PlannerMemory(shape) for _ in range(workers)]
+
+        self.processes = [
+            Process(
+                target=planner_worker,
+                args=(
+                    index,
+                    dimensions,
+                    resolution,
+                    radius,
+                    obstacles,
+                    self.request_q,
+                    self.control_qs[index],
+                    self.memories[index],
+                    self.overflow_qs[index],
+                    planner_options,
+                    profile,
+                ),
+                daemon=True,
+            )
+            for index in range(workers)
+        ]
+        for process in self.processes:
+            process.start()
 
+        self.tickets = itertools.count()
+        self.pending = set()  # tickets requested and neither cancelled nor collected
+        self.results = {}  # ticket -> Path, for pending tickets that have been planned
         self.latest_path = None
         self.latest_path_id = None
 
-    def _replace_queue_item(self, q, item):
-        try:
-            while True:
-                q.get_nowait()
-        except queue.Empty:
-            pass
-        q.put(item)
-
-
     def set_objects(self, obstacles):
-        self._replace_queue_item(self.obstacle_q, (obstacles))
-
-    def request_path(self, start, goal_region, smooth=True, temporary_obstacles=None):
-        path_id = hash((goal_region.rasterize.__hash__() + time.time()) % (2**32))
-        self._replace_queue_item(
-            self.request_q,
-            ("plan", start, goal_region, smooth, temporary_obstacles, path_id)
-        )
+        for control_q in self.control_qs:
+            control_q.put(("objects", obstacles))
+
+    def request_path(self, start, goal_region, smooth=True, temporary_obstacles=None) -> int:
+        """Queue a request and return its ticket, which `get_path` returns the result under."""
+        path_id = next(self.tickets)
+        self.pending.add(path_id)
+        self.request_q.put(("plan", start, goal_region, smooth, temporary_obstacles, path_id))
         return path_id
 
-    def get_path(self):
-        path_id = None
-        try:
-            while True:
-                self.latest_path, path_id, obstacle_pixels, goal_pixels = self.result_q.get_nowait()
-                if obstacle_pixels is not None:
-                    set_obstacle_pixels(obstacle_pixels)
-                    TELEMETRY.submit("obstacle pixels", obstacle_pixels)
-                if goal_pixels is not None:
-                    set_goal_pixels(goal_pixels)
-                    TELEMETRY.submit("goal pixels", goal_pixels)
-        except queue.Empty:
-            pass
-        return self.latest_path, path_id
+    def cancel_path(self, path_id) -> None:
+        """Drop a request: a planner that hasn't started it skips it, and any result is discarded."""
+        if path_id not in self.pending:
+            return
+        self.pending.discard(path_id)
+        self.results.pop(path_id, None)
+        for control_q in self.control_qs:
+            control_q.put(("cancel", path_id))
+
+    def get_path(self, path_id):
+        """
+        The path planned for ticket `path_id`, or None if it hasn't arrived. A ticket's path is
+        only returned once.
+        """
+        self.poll()
+        if path_id not in self.results:
+            return None
+        self.pending.discard(path_id)
+        return self.results.pop(path_id)
+
+    def poll(self) -> None:
+        """Collect the results the planners have finished since the last call."""
+        for index, memory in enumerate(self.memories):
+            arrived = memory.read_paths()
+            try:
+                while True:
+                    arrived.append(self.overflow_qs[index].get_nowait())
+            except queue.Empty:
+                pass
+
+            for path_id, waypoints in arrived:
+                if path_id not in self.pending:  # cancelled
+                    continue
+                self.results[path_id] = Path(waypoints)
+                if self.latest_path_id is None or path_id > self.latest_path_id:
+                    self.latest_path = self.results[path_id]
+                    self.latest_path_id = path_id
+                    if self.debug_pixels:
+                        self._show_pixels(memory)
+
+    def get_grid(self):
+        """
+        A copy of the occupancy grid a planner last planned on or received (true = obstacle),
+        or None if none has published one yet. With a "window_size", it covers the window the
+        planner was last at. If the planner stopped partway through publishing one, this is the
+        last grid read, or None.
+        """
+        grid = self.memories[0].read_grid()
+        return None if grid is None else (grid[0] & BLOCKED).astype(bool)
+
+    def _cell_centers(self, mask, offset):
+        ys, xs = np.nonzero(mask)
+        ys += offset[0]
+        xs += offset[1]
+        return list(np.column_stack((
+            self.origin[0] + (xs + 0.5) * self.resolution,
+            self.origin[1] + (ys + 0.5) * self.resolution,
+        )))
+
+    def _show_pixels(self, memory):
+        grid = memory.read_grid()
+        if grid is None:
+            return
+        layers, _, offset = grid
+        obstacle_pixels = self._cell_centers(layers & BLOCKED, offset)
+        goal_pixels = self._cell_centers(layers & GOAL, offset)
+        set_obstacle_pixels(obstacle_pixels)
+        TELEMETRY.submit("obstacle pixels", obstacle_pixels)
+        set_goal_pixels(goal_pixels)
+        TELEMETRY.submit("goal pixels", goal_pixels)
 
     def shutdown(self):
         print("Shutting down path planner...")
-        self._replace_queue_item(self.request_q, ("shutdown",))
-        self.process.join(5)
+        for control_q in self.control_qs:
+            control_q.put(("shutdown",))
+        self.request_q.cancel_join_thread()  # requests left unplanned needn't be flushed
+        for process in self.processes:
+            process.join(5)
+        for memory in self.memories:
+            memory.close()
 
 
 
 def planner_worker(
+    index,
     dimensions,
     resolution,
     radius,
     obstacles,
     request_q,
-    obstacle_q,
-    result_q,
+    control_q,
+    memory,
+    overflow_q,
+    planner_options,
+    profile=False,
 ):
-    profiler = cProfile.Profile()
-    profiler.enable()
+    profiler = cProfile.Profile() if profile else None
+    if profiler is not None:
+        profiler.enable()
     signal.signal(signal.SIGINT, signal.SIG_IGN)  # ignore interrupt in child process
-    planner = PathPlanner(dimensions, resolution, radius, obstacles, debug_pixels=False)
-    while True:
+    planner = PathPlanner(dimensions, resolution, radius, obstacles, **planner_options)
+    memory.publish_grid(planner.grid, offset=planner.offset)
+    cancelled = set()
+
+    def handle_control():
+        """Apply the latest obstacles and record cancellations. Returns False on shutdown."""
+        latest = None
         try:
             while True:
-                obs = obstacle_q.get_nowait()
-                planner.set_objects(obs)
+                msg = control_q.get_nowait()
+                if msg[0] == "shutdown":
+                    return False
+                elif msg[0] == "objects":
+                    latest = msg[1]
+                elif msg[0] == "cancel":
+                    cancelled.add(msg[1])
         except queue.Empty:
             pass
-        
+        if latest is not None:
+            version = planner.grid_version
+            planner.set_objects(latest)
+            if planner.grid_version != version:
+                memory.publish_grid(planner.grid, offset=planner.offset)
+        return True
+
+    while handle_control():
         try:
             msg = request_q.get(timeout=0.1)  # check every 100ms
         except queue.Empty:
             continue
 
-        kind = msg[0]
-        
-        if kind == "shutdown":
+        # obstacles or a cancellation may have arrived while waiting
+        if not handle_control():
             break
 
-        elif kind == "plan":
-            _, start, goal_region, smooth, temporary_obstacles, path_id = msg
-            # print("Planning path to", goal_region, "from", start)
-            a = time.time()
-            path, obstacle_pixels, goal_pixels = planner.find_path(start, goal_region, smooth, temporary_obstacles)
-            # print("Path planned in", time.time() - a, "seconds")
-            # print("Planned path with", len(path.waypoints), "waypoints")
-            try:
-                while True:
-                    result_q.get_nowait()
-            except queue.Empty:
-                pass
-            result_q.put((path, path_id, obstacle_pixels, goal_pixels))
+        _, start, goal_region, smooth, temporary_obstacles, path_id = msg
+        skip = path_id in cancelled
+        # requests are taken in ticket order, so cancellations of this ticket and earlier ones are spent
+        cancelled = {ticket for ticket in cancelled if ticket > path_id}
+        if skip:
+            continue
+
+        # print("Planning path to", goal_region, "from", start)
+        a = time.time()
+        path, _, _ = planner.find_path(start, goal_region, smooth, temporary_obstacles)
+        # print("Path planned in", time.time() - a, "seconds")
+        # print("Planned path with", len(path.waypoints), "waypoints")
+
+        # the grid first, so a reader that sees this path sees its grid or a newer one
+        memory.publish_grid(planner.last_grid, planner.last_goal_window, path_id, planner.offset)
+        if not memory.publish_path(path_id, path.waypoints):
+            overflow_q.put((path_id, path.waypoints))
     print("Path planner shutting down.")
-    profiler.disable()
-    profiler.dump_stats("path_planner_profile.prof")
+    memory.close()
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats("path_planner_profile.prof" if index == 0 else f"path_planner_profile_{index}.prof")
 
 
 
 
 class PathPlanner:
-    def __init__(self, dimensions, resolution, radius, obstacles: list[GridObject], debug_pixels=False):
+    FIELD_CACHE_SIZE = 4  # distance fields kept for HeuristicType.DISTANCE_FIELD
+
+    def __init__(self, dimensions, resolution, radius, obstacles: list[GridObject], debug_pixels=False, search_type: SearchType = SearchType.ASTAR, heuristic_type: HeuristicType = HeuristicType.OCTILE, turn_radius: float = 0.0, window_size: float = None):
         """
         dimensions: ((xmin, ymin), (xmax, ymax))
         resolution: meters per cell
         radius: obstacle inflation radius
+        search_type: the search algorithm used by `find_path`; see `SearchType`
+        heuristic_type: the heuristic of the ASTAR and JPS searches; see `HeuristicType`
+        turn_radius: radius of the arcs smoothed paths turn along; 0 leaves sharp corners
+        window_size: if set, the grid is a square window this many meters across that follows
+            the start of each plan, instead of covering `dimensions`
+        \n
+        With a window, memory doesn't grow with the course: plans can start anywhere, and a goal
+        outside the window is planned to the free edge cells nearest it, then straight on.
         """
         self.resolution = resolution
-        self.origin = np.array(dimensions[0])
-
-        xs = np.arange(dimensions[0][0], dimensions[1][0], resolution)
-        ys = np.arange(dimensions[0][1], dimensions[1][1], resolution)
-        self.xs = xs
-        self.ys = ys
-
+        self.window_size = window_size
+        self.shape = self.grid_shape(dimensions, resolution, window_size)
 
-        self.mesh_grid = np.meshgrid(xs, ys, indexing="ij")
-        self.grid = np.zeros(self.mesh_grid[0].shape, dtype=bool)
-        self.shape = self.grid.shape
-
-        # occupancy grid (true = obstacle)
+        # occupancy grid (true = obstacle), kept up to date one changed object at a time
         self.obstacles = obstacles
         self.radius = radius
-        self.grid = self.compute_occupancy_grid(self.shape, obstacles)
+        if window_size is None:
+            self.origin = np.array(dimensions[0])
+            self.offset = (0, 0)  # (row, column) of the grid's first cell within `dimensions`
+            self.occupancy = OccupancyLayer(self.shape, resolution, self.origin, radius)
+            self.temporary_occupancy = OccupancyLayer(self.shape, resolution, self.origin, radius)
+        else:
+            # the window starts over the middle of `dimensions`
+            middle = (np.array(dimensions[1]) - np.array(dimensions[0])) / 2 / resolution
+            self.offset = (int(middle[1]) - self.shape[0] // 2, int(middle[0]) - self.shape[1] // 2)
+            self.occupancy = RollingOccupancy(self.shape, resolution, dimensions[0], radius, self.offset)
+            self.temporary_occupancy = RollingOccupancy(self.shape, resolution, dimensions[0], radius, self.offset)
+            self.origin = self.occupancy.origin
+
+        self.xs = self.origin[0] + np.arange(self.shape[1]) * resolution
+        self.ys = self.origin[1] + np.arange(self.shape[0]) * resolution
+        self.mesh_grid = np.meshgrid(self.xs, self.ys, indexing="xy")
+        self.grid = np.zeros(self.shape, dtype=bool)
+
+        self.occupancy.set_objects(obstacles)
+        self.grid = self.occupancy.window()
+        self.grid_version = 0  # bumped whenever the static grid changes
         self.cost_maps = {}
         self.solved_paths = {}
         self.debug_pixels = debug_pixels
 
+        self.search_type = search_type
+        self.heuristic_type = heuristic_type
+        self.turn_radius = turn_radius
+        self.flat = FlatGrid(self.shape)
+        self._blocked_cache = None
+        self._incremental = None  # D* Lite state toward the last goal region, for SearchType.INCREMENTAL
+        self._jump_cache = None  # (blocked, goal, tables) of the last SearchType.JPS search
+        self._fields = OrderedDict()  # padded goal -> (blocked, distance field over it), least recently used first
+
+        # the grid and goal window of the last find_path, which the planner process publishes
+        self.last_grid = self.grid
+        self.last_goal_window = None
+
+    @staticmethod
+    def grid_shape(dimensions, resolution, window_size: float = None) -> tuple[int, int]:
+        """The (rows, columns) of the grid over `dimensions`, or of the window; rows run along y."""
+        if window_size is not None:
+            side = len(np.arange(0, window_size, resolution))
+            return side, side
+        xs = np.arange(dimensions[0][0], dimensions[1][0], resolution)
+        ys = np.arange(dimensions[0][1], dimensions[1][1], resolution)
+        return len(ys), len(xs)
+
     def set_objects(self, obstacles):
         self.obstacles = obstacles
-        self.grid = self.compute_occupancy_grid(self.shape, obstacles)
+        if self.occupancy.set_objects(obstacles):
+            self.grid_version += 1
+            self.grid = self.occupancy.window()
+
+    def follow(self, position) -> None:
+        """
+        Move the window over `position` once it is more than a quarter of the window from the
+        middle. Does nothing without a window_size.
+        """
+        if self.window_size is None:
+            return
+        h, w = self.shape
+        row = int(np.floor((position[1] - self.occupancy.base[1]) / self.resolution))
+        col = int(np.floor((position[0] - self.occupancy.base[0]) / self.resolution))
+        if abs(row - (self.offset[0] + h // 2)) <= h // 4 and abs(col - (self.offset[1] + w // 2)) <= w // 4:
+            return
+
+        self.offset = (row - h // 2, col - w // 2)
+        self.occupancy.shift(self.offset)
+        self.temporary_occupancy.shift(self.offset)
+        self.origin = self.occupancy.origin
+        self.xs = self.origin[0] + np.arange(w) * self.resolution
+        self.ys = self.origin[1] + np.arange(h) * self.resolution
+        self.mesh_grid = np.meshgrid(self.xs, self.ys, indexing="xy")
+
+        # every cell index now means a different place, so nothing searched before carries over
+        self.grid = self.occupancy.window()
+        self.grid_version += 1
+        self._incremental = None
+        self._jump_cache = None
+        self._fields.clear()
+
+    def _border_goal(self, goal_region, grid):
+        """
+        For a goal outside the window: the goal window of the free edge cells nearest it, and the
+        point in it to finish at, or None if the goal has no known position.
+        """
+        if hasattr(goal_region, "bounding_box"):
+            xmin, xmax, ymin, ymax = goal_region.bounding_box()
+            point = np.array([(xmin + xmax) / 2, (ymin + ymax) / 2])
+        elif hasattr(goal_region, "center"):
+            point = np.asarray(goal_region.center, dtype=float)
+        else:
+            return None
+
+        h, w = grid.shape
+        border = np.zeros((h, w), dtype=bool)
+        border[[0, -1], :] = True
+        border[:, [0, -1]] = True
+        border &= ~grid
+        if not border.any():
+            return None
+
+        y, x = self.world_to_grid(point)
+        y, x = min(max(y, 0), h - 1), min(max(x, 0), w - 1)
+        reach = max(h, w) // 8
+        near = border.copy()
+        near[:max(y - reach, 0)] = False
+        near[y + reach + 1:] = False
+        near[:, :max(x - reach, 0)] = False
+        near[:, x + reach + 1:] = False
+        return crop_window(near if near.any() else border), point
 
     def compute_occupancy_grid(self, shape, obstacles: list[GridObject]):
         """Compute occupancy grid from list of GridObjects."""
         grid = np.zeros(shape, dtype=bool)
         for obj in obstacles:
-            grid |= obj.rasterize(self.grid, self.resolution, self.origin)
+            rows, cols, mask = obj.rasterize_window(self.grid, self.resolution, self.origin)
+            grid[rows, cols] |= mask
         if self.radius > 0:
             dist = distance_transform_edt(~grid) * self.resolution
             grid = dist <= self.radius
@@ -187,22 +410,34 @@ class PathPlanner:
 
 
     def find_path(self, start, goal_region, smooth=True, temporary_obstacles=None):
+        self.follow(start)
         grid = self.grid
         if temporary_obstacles is not None:
-            temp_grid = self.compute_occupancy_grid(self.shape, temporary_obstacles)
-            grid = grid | temp_grid
+            self.temporary_occupancy.set_objects(temporary_obstacles)
+            grid = grid | self.temporary_occupancy.window()
+
+        goal_window = goal_region.rasterize_window(grid, self.resolution, self.origin)
+        beyond = None  # the goal's position, when it is outside the window
+        if self.window_size is not None and not goal_window[2].any():
+            border = self._border_goal(goal_region, grid)
+            if border is not None:
+                goal_window, beyond = border
+        goal_rows, goal_cols, goal_mask = goal_window
+        self.last_grid = grid
+        self.last_goal_window = goal_window
+        ys, xs = np.nonzero(goal_mask)
+        ys += goal_rows.start
+        xs += goal_cols.start
 
-        goal_cells = goal_region.rasterize(grid, self.resolution, self.origin)
         obstacle_pixels = None
         goal_pixels = None
         if self.debug_pixels:
             goal_pixels = []
-            ys, xs = np.where(goal_cells)
             for x, y in zip(xs, ys):
                 goal_pixels.append(self.grid_to_world((y, x)))
             obstacle_pixels = []
-            ys, xs = np.where(grid)
-            for x, y in zip(xs, ys):
+            obstacle_ys, obstacle_xs = np.where(grid)
+            for x, y in zip(obstacle_xs, obstacle_ys):
                 obstacle_pixels.append(self.grid_to_world((y, x)))
         
         start_idx = self.world_to_grid(start)
@@ -215,6 +450,101 @@ class PathPlanner:
             start_idx = self.world_to_grid(start)
             sy, sx = start_idx
 
+        if len(xs) == 0:
+            return self.find_simple_path(start, goal_region), obstacle_pixels, goal_pixels
+
+        goal_cy = int(np.mean(ys))
+        goal_cx = int(np.mean(xs))
+
+        if self.search_type == SearchType.HEAP:
+            cells = self._search_heap(grid, paste_window(grid, goal_window), (sy, sx), (goal_cy, goal_cx))
+        elif self.search_type == SearchType.INCREMENTAL:
+            cells = self._search_incremental(grid, goal_window, (sy, sx))
+        elif self.search_type == SearchType.JPS:
+            cells = self._search_jps(grid, goal_window, (sy, sx), (goal_cy, goal_cx))
+        else:
+            cells = self._search_flat(grid, goal_window, (sy, sx), (goal_cy, goal_cx))
+
+        if cells is None:
+            if beyond is not None:
+                return Path([start, beyond]), obstacle_pixels, goal_pixels
+            return self.find_simple_path(start, goal_region), obstacle_pixels, goal_pixels
+        path = self._reconstruct_path(cells, smooth, grid)
+        if beyond is not None:
+            # past the window nothing is known, so the rest is straight on
+            path = Path(np.vstack((path.waypoints, beyond)))
+        return path, obstacle_pixels, goal_pixels
+
+    def _blocked_bytes(self, grid):
+        """The padded, flattened grid for the flat-index engines; cached for the static grid."""
+        if grid is self.grid:
+            if self._blocked_cache is None or self._blocked_cache[0] != self.grid_version:
+                self._blocked_cache = (self.grid_version, self.flat.pad(grid, True))
+            return self._blocked_cache[1]
+        return self.flat.pad(grid, True)
+
+    def _heuristic(self, goal, goal_center):
+        """The heuristic for the ASTAR and JPS searches to the padded goal cells `goal`."""
+        if self.heuristic_type != HeuristicType.DISTANCE_FIELD:
+            return self.flat.octile(*goal_center)
+
+        # a field is taken over the static grid, so it stays admissible whatever temporary
+        # obstacles are added, and is kept while obstacles are only added to the grid: the costs
+        # it gives are then still lower bounds, if less tight around the new obstacles
+        blocked = self._blocked_bytes(self.grid)
+        entry = self._fields.get(goal)
+        if entry is not None and (entry[0] is blocked or not (
+            np.frombuffer(entry[0], dtype=np.bool_) & ~np.frombuffer(blocked, dtype=np.bool_)
+        ).any()):
+            self._fields.move_to_end(goal)
+            return entry[1]
+
+        field = self.flat.distance_field(blocked, goal)
+        self._fields[goal] = (blocked, field)
+        self._fields.move_to_end(goal)
+        if len(self._fields) > self.FIELD_CACHE_SIZE:
+            self._fields.popitem(last=False)
+        return field
+
+    def _search_flat(self, grid, goal_window, start_idx, goal_center):
+        blocked = self._blocked_bytes(grid)
+        goal = self.flat.pad_window(goal_window)
+        start = self.flat.index(*start_idx)
+        heuristic = self._heuristic(goal, goal_center)
+        if not callable(heuristic) and heuristic[start] >= INF:
+            return None  # no goal cell is reachable even without the temporary obstacles
+        return self.flat.astar(blocked, goal, start, heuristic)
+
+    def _search_jps(self, grid, goal_window, start_idx, goal_center):
+        blocked = self._blocked_bytes(grid)
+        goal = self.flat.pad_window(goal_window)
+        cache = self._jump_cache
+        if cache is None or cache[0] is not blocked or cache[1] != goal:
+            cache = self._jump_cache = (blocked, goal, self.flat.jump_tables(blocked, goal))
+        start = self.flat.index(*start_idx)
+        heuristic = self._heuristic(goal, goal_center)
+        if not callable(heuristic) and heuristic[start] >= INF:
+            return None
+        return self.flat.jps(blocked, goal, cache[2], start, heuristic)
+
+    def _search_incremental(self, grid, goal_window, start_idx):
+        """
+        D* Lite, reusing the search from the last plan if it was to the same goal cells. Changes
+        to the grid since then, from set_objects or different temporary obstacles, are repaired
+        in place.
+        """
+        blocked = self._blocked_bytes(grid)
+        goal = self.flat.pad_window(goal_window)
+        if self._incremental is None or self._incremental.goal != goal:
+            self._incremental = IncrementalSearch(self.flat, goal)
+        cells = self._incremental.plan(blocked, self.flat.index(*start_idx))
+        self.flat.expanded = self._incremental.expanded
+        return cells
+
+    def _search_heap(self, grid, goal_cells, start_idx, goal_center):
+        """The original A*, kept as SearchType.HEAP for comparison."""
+        sy, sx = start_idx
+        goal_cy, goal_cx = goal_center
         h, w = grid.shape
         INF = 1e9
 
@@ -226,13 +556,6 @@ class PathPlanner:
 
         g_score[sy, sx] = 0.0
 
-        ys, xs = np.where(goal_cells)
-        if len(xs) == 0:
-            return self.find_simple_path(start, goal_region), obstacle_pixels, goal_pixels
-
-        goal_cy = int(np.mean(ys))
-        goal_cx = int(np.mean(xs))
-
         NEIGHBORS = [
             (-1,  0, 1.0), (1,  0, 1.0),
             (0, -1, 1.0), (0,  1, 1.0),
@@ -255,14 +578,17 @@ class PathPlanner:
             closed[y, x] = True
 
             if goal_cells[y, x]:
-                return self._reconstruct_path(
-                    start_idx=(sy, sx),
-                    goal_idx=(y, x),
-                    parent_y=parent_y,
-                    parent_x=parent_x,
-                    smooth=smooth,
-                    grid=grid
-                ), obstacle_pixels, goal_pixels
+                cells = []
+                while not (y == sy and x == sx):
+                    cells.append((y, x))
+                    py = parent_y[y, x]
+                    px = parent_x[y, x]
+                    if py < 0:
+                        break
+                    y, x = py, px
+                cells.append((sy, sx))
+                cells.reverse()
+                return cells
 
             base_g = g_score[y, x]
 
@@ -292,131 +618,190 @@ class PathPlanner:
                 f_score[ny, nx] = f_new
                 heapq.heappush(open_set, (f_new, ny, nx))
 
-        return self.find_simple_path(start, goal_region), obstacle_pixels, goal_pixels
-
-    def _reconstruct_path(self, start_idx, goal_idx, parent_y, parent_x, smooth, grid):
-        y, x = goal_idx
-        sy, sx = start_idx
-
-        path = []
-        while not (y == sy and x == sx):
-            path.append(self.grid_to_world((y, x)))
-            py = parent_y[y, x]
-            px = parent_x[y, x]
-            if py < 0:
-                break
-            y, x = py, px
+        return None
 
-        path.append(self.grid_to_world(start_idx))
-        path.reverse()
+    def _reconstruct_path(self, cells, smooth, grid):
+        if smooth:
+            return self.smooth_cells(cells, grid)
+        return Path([self.grid_to_world(cell) for cell in cells])
 
-        result = Path(path)
-        return self.smooth(result, grid) if smooth else result
-    
     def smooth(self, path: Path, grid) -> Path:
-        """Smooth the given path using simple shortcutting."""
-        waypoints = path.waypoints.tolist()
-        if len(waypoints) < 3:
-            return path
-
-        smoothed = [waypoints[0]]
-        i = 0
-        while i < len(waypoints) - 1:
-            j = len(waypoints) - 1
-            while j > i + 1:
-                if self.is_line_free(waypoints[i], waypoints[j], grid):
-                    break
-                j -= 1
-            smoothed.append(waypoints[j])
-            i = j
-
-        return Path(smoothed)
-    
-    def is_line_free(self, start, end, grid) -> bool:
-        """Check if the line between start and end is free of obstacles using Bresenham's algorithm."""
-        start_idx = self.world_to_grid(start)
-        end_idx = self.world_to_grid(end)
-
-        y0, x0 = start_idx
-        y1, x1 = end_idx
-        dx = abs(x1 - x0)
-        dy = abs(y1 - y0)
-        sx = 1 if x0 < x1 else -1
-        sy = 1 if y0 < y1 else -1
-        err = dx - dy
-
-        while True:
-            if grid[y0, x0]:
-                return False
+        """Smooth the given path; see `smooth_cells`."""
+        return self.smooth_cells([self.world_to_grid(p) for p in path.waypoints], grid)
 
-            if (x0, y0) == (x1, y1):
-                break
-
-            err2 = err * 2
-            if err2 > -dy:
-                err -= dy
-                x0 += sx
-            if err2 < dx:
-                err += dx
-                y0 += sy
+    def smooth_cells(self, cells, grid) -> Path:
+        """
+        Shortcut a path through grid cells wherever the straight line stays free, then round its
+        corners to `turn_radius` if set.
+        \n
+        From each kept cell, the farthest reachable one is found by doubling the step while the
+        line is free, then bisecting between the last free and first blocked step. That takes a
+        logarithmic number of line checks where trying every later cell took a linear one, but as
+        free lines aren't monotone along the path, it can stop short of a free cell further on.
+        Every shortcut taken is checked, so the result is no less clear than the cells it replaces.
+        """
+        cells = np.asarray(cells)
+        if len(cells) >= 3:
+            # only the cells where the path turns can be kept
+            steps = np.diff(cells, axis=0)
+            turns = np.flatnonzero(np.any(steps[1:] != steps[:-1], axis=1)) + 1
+            cells = cells[np.concatenate(([0], turns, [len(cells) - 1]))]
+
+        kept = [0]
+        last = len(cells) - 1
+        while kept[-1] < last:
+            i = kept[-1]
+            free, step = i + 1, 1  # the next cell is always reachable, it's the path itself
+            blocked = None
+            while free < last:
+                j = min(i + 2 * step, last)
+                if not self.is_line_free(cells[i], cells[j], grid, cells=True):
+                    blocked = j
+                    break
+                free, step = j, 2 * step
+            if blocked is not None:
+                while blocked - free > 1:
+                    j = (free + blocked) // 2
+                    if self.is_line_free(cells[i], cells[j], grid, cells=True):
+                        free = j
+                    else:
+                        blocked = j
+            kept.append(free)
+
+        waypoints = [self.grid_to_world(cell) for cell in cells[kept]]
+        if self.turn_radius > 0 and len(waypoints) >= 3:
+            waypoints = self.fillet(waypoints, grid)
+        return Path(waypoints)
+
+    def fillet(self, waypoints, grid) -> list:
+        """
+        Replace each corner with an arc of `turn_radius`, shrunk where the legs are too short to
+        fit it, so a path can be followed at full speed. Corners whose arc would cross an
+        obstacle are kept sharp.
+        """
+        waypoints = np.asarray(waypoints, dtype=float)
+        out = [waypoints[0]]
+        # the distance along each leg already used by the arc at its start
+        used = 0.0
+        for a, b, c in zip(waypoints[:-2], waypoints[1:-1], waypoints[2:]):
+            u, v = a - b, c - b
+            lu, lv = np.linalg.norm(u), np.linalg.norm(v)
+            u, v = u / lu, v / lv
+            half = np.arccos(np.clip(np.dot(u, v), -1.0, 1.0)) / 2  # half the angle at the corner
+            if np.pi / 2 - half < 1e-3 or half < 1e-3:  # straight through, or doubling back
+                used = 0.0
+                out.append(b)
+                continue
 
-        return True
+            # tangent points are `tangent` from the corner along each leg; legs are shared by two arcs
+            tangent = min(self.turn_radius / np.tan(half), lu - used, lv / 2)
+            radius = tangent * np.tan(half)
+            bisector = (u + v) / np.linalg.norm(u + v)
+            center = b + bisector * (radius / np.sin(half))
+
+            p, q = b + u * tangent, b + v * tangent
+            start = np.arctan2(p[1] - center[1], p[0] - center[0])
+            sweep = np.arctan2(q[1] - center[1], q[0] - center[0]) - start
+            sweep = (sweep + np.pi) % (2 * np.pi) - np.pi
+            # a chord every 1/4 radian keeps it within 1% of the radius of the arc
+            angles = start + sweep * np.linspace(0.0, 1.0, max(2, int(np.ceil(abs(sweep) / 0.25)) + 1))
+            arc = center + radius * np.column_stack((np.cos(angles), np.sin(angles)))
+
+            if tangent > 1e-6 and all(self.is_line_free(s, e, grid) for s, e in zip(arc[:-1], arc[1:])):
+                if np.linalg.norm(arc[0] - out[-1]) > 1e-6:
+                    out.append(arc[0])
+                out.extend(arc[1:])
+                used = tangent
+            else:
+                used = 0.0
+                out.append(b)
+        out.append(waypoints[-1])
+        return out
+
+    @staticmethod
+    def line_cells(start, end) -> np.ndarray:
+        """
+        Every cell the segment between the centers of cells `start` and `end` passes through or
+        touches, as (row, column) rows. Where it passes exactly through a corner, both cells
+        beside the corner are included.
+        """
+        (y0, x0), (y1, x1) = start, end
+        dy, dx = abs(y1 - y0), abs(x1 - x0)
+        sy, sx = (1 if y1 > y0 else -1), (1 if x1 > x0 else -1)
+
+        # the k-th column boundary is crossed at t = (2k + 1) / 2dx; scaled by 2 dx dy to stay integral
+        x_keys = (2 * np.arange(dx) + 1) * max(dy, 1)
+        y_keys = (2 * np.arange(dy) + 1) * max(dx, 1)
+        keys = np.concatenate((x_keys, y_keys))
+        is_y = np.concatenate((np.zeros(dx, dtype=bool), np.ones(dy, dtype=bool)))
+        order = np.lexsort((is_y, keys))  # by crossing, columns first on a tie
+        keys, is_y = keys[order], is_y[order]
+
+        steps = np.zeros((dx + dy, 2), dtype=np.int64)
+        steps[is_y, 0] = sy
+        steps[~is_y, 1] = sx
+        cells = np.empty((dx + dy + 1, 2), dtype=np.int64)
+        cells[0] = (y0, x0)
+        np.cumsum(steps, axis=0, out=cells[1:])
+        cells[1:] += cells[0]
+
+        # at a corner, the walk steps across then up; add the cell up first
+        corners = np.flatnonzero(keys[1:] == keys[:-1])
+        if len(corners):
+            cells = np.concatenate((cells, cells[corners] + (sy, 0)))
+        return cells
+
+    def is_line_free(self, start, end, grid, cells=False) -> bool:
+        """
+        Check if the line between start and end is free of obstacles, including every cell it
+        touches. `start` and `end` are world positions, or (row, column) cells if `cells` is set.
+        """
+        if not cells:
+            start, end = self.world_to_grid(start), self.world_to_grid(end)
+        line = self.line_cells(start, end)
+        h, w = grid.shape
+        ys, xs = line[:, 0], line[:, 1]
+        if ys.min() < 0 or xs.min() < 0 or ys.max() >= h or xs.max() >= w:
+            return False
+        return not grid[ys, xs].any()
     
     def find_free_point(self, start, grid):
-        """Find the closest free point to the start position."""
-        start_idx = self.world_to_grid(start)
-        sy, sx = start_idx
+        """
+        Find the closest free point to the start position.
+        \n
+        Takes the distance transform over a window around the start, which finds the nearest
+        free cell in it. Cells outside the window are farther than its reach, so the window only
+        grows while the nearest free cell in it isn't within that.
+        """
+        sy, sx = self.world_to_grid(start)
         h, w = grid.shape
+        reach = 2 * math.ceil(self.radius / self.resolution) + 2  # enough for a start inside one inflated buoy
+        while True:
+            r0, r1 = max(sy - reach, 0), min(sy + reach + 1, h)
+            c0, c1 = max(sx - reach, 0), min(sx + reach + 1, w)
+            whole = r1 - r0 == h and c1 - c0 == w
+            window = grid[r0:r1, c0:c1]
+            if window.all():
+                if whole:
+                    return start
+                reach *= 2
+                continue
 
-        visited = np.zeros((h, w), dtype=bool)
-        queue = deque([(sy, sx)])
-        visited[sy, sx] = True
-
-        NEIGHBORS = [
-            (-1,  0), (1,  0),
-            (0, -1), (0,  1),
-            (-1, -1), (-1, 1),
-            (1, -1),  (1,  1),
-        ]
-
-        while queue:
-            y, x = queue.popleft()
-
-            if not grid[y, x]:
-                return self.grid_to_world((y, x))
-
-            for dy, dx in NEIGHBORS:
-                ny = y + dy
-                nx = x + dx
-
-                if ny < 0 or ny >= h or nx < 0 or nx >= w:
-                    continue
-                if visited[ny, nx]:
-                    continue
-
-                visited[ny, nx] = True
-                queue.append((ny, nx))
-
-        return start
-        
+            distance, (rows, cols) = distance_transform_edt(window, return_indices=True)
+            y, x = sy - r0, sx - c0
+            if distance[y, x] <= reach or whole:
+                return self.grid_to_world((r0 + rows[y, x], c0 + cols[y, x]))
+            reach *= 2
 
     def find_simple_path(self, start, goal):
         """Find the closest point in the goal to the start and return a straight-line path."""
-        goal_cells = goal.rasterize(self.grid, self.resolution, self.origin)
-        ys, xs = np.where(goal_cells)
-
+        rows, cols, mask = goal.rasterize_window(self.grid, self.resolution, self.origin)
+        ys, xs = np.nonzero(mask)
         start = np.asarray(start)
-        best_pos = None
-        best_dist = np.inf
-
-        for y, x in zip(ys, xs):
-            pos = self.grid_to_world((y, x))
-            d = np.linalg.norm(pos - start)
-            if d < best_dist:
-                best_dist = d
-                best_pos = pos
-
-        if best_pos is None:
+        if len(ys) == 0:
             return Path([start, start])
 
+        centers = self.origin + (np.column_stack((xs + cols.start, ys + rows.start)) + 0.5) * self.resolution
+        offsets = centers - start
+        best_pos = centers[np.argmin(np.einsum("ij,ij->i", offsets, offsets))]
         return Path([start, best_pos])
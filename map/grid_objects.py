@@ -1,12 +1,52 @@
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+import math
 import numpy as np
 
 
+def crop_window(full: np.ndarray) -> tuple[slice, slice, np.ndarray]:
+    """The bounding box of the set cells of a grid-sized mask, as a window."""
+    rows = np.flatnonzero(full.any(axis=1))
+    cols = np.flatnonzero(full.any(axis=0))
+    if len(rows) == 0:
+        return slice(0, 0), slice(0, 0), np.zeros((0, 0), dtype=bool)
+    rows, cols = slice(int(rows[0]), int(rows[-1]) + 1), slice(int(cols[0]), int(cols[-1]) + 1)
+    return rows, cols, full[rows, cols]
+
+
+def paste_window(grid, window) -> np.ndarray:
+    """A grid-sized mask with only the cells of `window` set."""
+    rows, cols, mask = window
+    out = np.zeros_like(grid, dtype=bool)
+    out[rows, cols] = mask
+    return out
+
+
 class GridObject(ABC):
-    @abstractmethod
+    # subclasses implement at least one of rasterize_window and rasterize; each defaults to the other
+
+    def rasterize_window(self, grid, resolution, origin) -> tuple[slice, slice, np.ndarray]:
+        """
+        Return the occupied cells as (row slice, column slice, mask) over the part of `grid` the
+        object covers, rather than a grid-sized array. The slices are clipped to the grid, and
+        may be empty if the object lies outside it. The mask may be shared, so don't modify it.
+        """
+        if type(self).rasterize is GridObject.rasterize:
+            raise NotImplementedError(f"{type(self).__name__} implements neither rasterize nor rasterize_window")
+        return crop_window(self.rasterize(grid, resolution, origin))
+
     def rasterize(self, grid, resolution, origin) -> np.ndarray:
-        """Return boolean grid marking occupied cells."""
-        ...
+        """Return boolean grid marking occupied cells. Kept for compatibility; prefer rasterize_window."""
+        if type(self).rasterize_window is GridObject.rasterize_window:
+            raise NotImplementedError(f"{type(self).__name__} implements neither rasterize nor rasterize_window")
+        return paste_window(grid, self.rasterize_window(grid, resolution, origin))
+
+    def key(self) -> tuple:
+        """A hashable summary of this object's shape and placement; equal objects have equal keys."""
+        return (type(self).__name__,) + tuple(
+            (name, tuple(np.ravel(value).tolist()))
+            for name, value in self.__dict__.items() if not name.startswith("_")
+        )
 
     def __eq__(self, value):
         if not isinstance(value, GridObject):
@@ -20,9 +60,12 @@ class GridObject(ABC):
 
 
 class StaticGridObject(GridObject):
+    # caches its rasterization; subclasses implement _rasterize_window or _rasterize
     def __init__(self):
         self._cached_grid = None
         self._cached_shape = None
+        self._cached_window = None
+        self._cached_window_key = None
 
     def rasterize(self, grid, resolution, origin):
         if self._cached_grid is None or self._cached_shape != grid.shape:
@@ -30,10 +73,22 @@ class StaticGridObject(GridObject):
             self._cached_shape = grid.shape
         return self._cached_grid
 
+    def rasterize_window(self, grid, resolution, origin) -> tuple[slice, slice, np.ndarray]:
+        key = (grid.shape, resolution, tuple(origin))
+        if self._cached_window is None or self._cached_window_key != key:
+            self._cached_window = self._rasterize_window(grid, resolution, origin)
+            self._cached_window_key = key
+        return self._cached_window
+
+    def _rasterize_window(self, grid, resolution, origin) -> tuple[slice, slice, np.ndarray]:
+        if type(self)._rasterize is StaticGridObject._rasterize:
+            raise NotImplementedError(f"{type(self).__name__} implements neither _rasterize nor _rasterize_window")
+        return crop_window(self._rasterize(grid, resolution, origin))
 
-    @abstractmethod
     def _rasterize(self, grid, resolution, origin) -> np.ndarray:
-        ...
+        if type(self)._rasterize_window is StaticGridObject._rasterize_window:
+            raise NotImplementedError(f"{type(self).__name__} implements neither _rasterize nor _rasterize_window")
+        return paste_window(grid, self._rasterize_window(grid, resolution, origin))
 
 class StaticSDFGridObject(StaticGridObject):
     @abstractmethod
@@ -56,7 +111,7 @@ class StaticSDFGridObject(StaticGridObject):
         return x_rot, y_rot
 
     
-    def _rasterize(self, grid, resolution, origin) -> np.ndarray:
+    def _rasterize_window(self, grid, resolution, origin):
         bounds = self.bounding_box()
         h, w = grid.shape
 
@@ -77,19 +132,73 @@ class StaticSDFGridObject(StaticGridObject):
 
         mask = self.sdf(X, Y) <= 0.0
 
-        out = np.zeros_like(grid, dtype=bool)
-        out[iymin:iymax, ixmin:ixmax] = mask
-
-        return out
+        return slice(iymin, iymax), slice(ixmin, ixmax), mask
 
 
 
 
 class CircleGridObject(StaticSDFGridObject):
+    # circles are rasterized from disk stamps shared between instances, as obstacles are rebuilt
+    # on every update. a stamp depends on the radius, the resolution and where the center falls
+    # within its cell, which is rounded to 1/SUBCELL_STEPS of a cell, so edge cells can differ from
+    # the exact SDF by up to half a step
+    SUBCELL_STEPS = 16
+    STAMP_CACHE_SIZE = 1024
+    _stamps = OrderedDict()  # (radius, resolution, subcell offset) -> (row offset, col offset, mask)
+
     def __init__(self, center: np.ndarray, radius: float):
         super().__init__()
         self.center = center
         self.radius = radius
+
+    @classmethod
+    def stamp(cls, radius, resolution, offset_y: int, offset_x: int):
+        """
+        The disk of `radius` with its center `offset` / SUBCELL_STEPS of a cell past a cell's
+        corner, as (row offset, column offset, mask) from that cell. Shared and read-only.
+        """
+        key = (radius, resolution, offset_y, offset_x)
+        stamp = cls._stamps.get(key)
+        if stamp is not None:
+            cls._stamps.move_to_end(key)
+            return stamp
+
+        r = radius / resolution
+        reach = math.ceil(r) + 1
+        k = np.arange(-reach, reach + 1)
+        dy = k + 0.5 - offset_y / cls.SUBCELL_STEPS
+        dx = k + 0.5 - offset_x / cls.SUBCELL_STEPS
+        disk = dy[:, None] ** 2 + dx[None, :] ** 2 <= r * r
+
+        rows = np.flatnonzero(disk.any(axis=1))
+        cols = np.flatnonzero(disk.any(axis=0))
+        if len(rows) == 0:
+            stamp = (0, 0, np.zeros((0, 0), dtype=bool))
+        else:
+            mask = disk[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1].copy()
+            stamp = (int(rows[0]) - reach, int(cols[0]) - reach, mask)
+        stamp[2].setflags(write=False)
+
+        cls._stamps[key] = stamp
+        if len(cls._stamps) > cls.STAMP_CACHE_SIZE:
+            cls._stamps.popitem(last=False)
+        return stamp
+
+    def _rasterize_window(self, grid, resolution, origin):
+        steps = self.SUBCELL_STEPS
+        u_x = round((self.center[0] - origin[0]) / resolution * steps)
+        u_y = round((self.center[1] - origin[1]) / resolution * steps)
+        cell_x, offset_x = divmod(u_x, steps)
+        cell_y, offset_y = divmod(u_y, steps)
+        row_offset, col_offset, mask = self.stamp(self.radius, resolution, offset_y, offset_x)
+
+        h, w = grid.shape
+        r0, c0 = cell_y + row_offset, cell_x + col_offset
+        r1 = min(h, r0 + mask.shape[0])
+        c1 = min(w, c0 + mask.shape[1])
+        rows = slice(min(max(0, r0), r1), r1) if r1 > 0 else slice(0, 0)
+        cols = slice(min(max(0, c0), c1), c1) if c1 > 0 else slice(0, 0)
+        return rows, cols, mask[rows.start - r0:rows.stop - r0, cols.start - c0:cols.stop - c0]
     
     def bounding_box(self):
         return (self.center[0] - self.radius, self.center[0] + self.radius,
@@ -1,6 +1,7 @@
 from ezauv.map.flat_map import FlatMap
 # from ezauv.map.grid import Grid
 from ezauv.map.grid import PathManager
+from ezauv.map.association import AssociationType, associate
 from ezauv.map.grid_objects import GridObject, CircleGridObject, LineGridObject
 from ezauv.map.path import Path
 from time import time
@@ -24,20 +25,34 @@ class ObstacleMap(FlatMap):
                  bot_radius: float,
                  resolution: float,
                  R: np.ndarray = None,
-                 P0: np.ndarray = None
+                 P0: np.ndarray = None,
+                 planner_options: dict = None,
+                 association_type: AssociationType = AssociationType.GREEDY
                  ):
         """
         Dimensions is a pair of tuples ((min_x, min_y), (max_x, max_y)). Keep in mind the bot starts at (0,0).
+        `planner_options` are passed on to the PathPlanner, eg. `{"search_type": SearchType.ASTAR}`;
+        `{"workers": n}` runs n planners, so `generate_paths` can plan to several goals at once.
+        `{"max_lateral_acceleration": a}` rounds the corners of paths to the radius the bot can
+        turn along at full speed, max_velocity² / a, unless "turn_radius" is given.
+        `association_type` decides how new detections are matched to the obstacles already seen;
+        see `AssociationType`.
         """
         super().__init__(max_velocity, bot_radius, R=R, P0=P0)
+        planner_options = dict(planner_options or {})
+        max_lateral_acceleration = planner_options.pop("max_lateral_acceleration", None)
+        if max_lateral_acceleration:
+            planner_options.setdefault("turn_radius", max_velocity ** 2 / max_lateral_acceleration)
         self.obstacles = []
         self.dimensions = dimensions
+        self.association_type = association_type
 
         self.path_manager = PathManager(
             dimensions=dimensions,
             resolution=resolution,
             radius=bot_radius,
-            obstacles=[]
+            obstacles=[],
+            planner_options=planner_options
         )
         self.obstacles_dirty = True
         self.paths = {}
@@ -46,17 +61,23 @@ class ObstacleMap(FlatMap):
         # check if the obstacles are about the same as before (within some tolerance), and if any have expired
 
         obstacle_distance_tolerance = 1
+        # a detection merges into a tracked obstacle when the distance from the closest edge of
+        # the tracked one to the far edge of the detection is within the tolerance
+        matches = associate(
+            [o.position for o in self.obstacles], [o.radius for o in self.obstacles],
+            [no.position for no in obstacles], [no.radius for no in obstacles],
+            obstacle_distance_tolerance, self.association_type,
+        )
+        matched = set()
+        for i, j in matches:
+            o, no = self.obstacles[i], obstacles[j]
+            o.radius = (o.radius + no.radius) / 2  # average radius
+            o.lifetime = no.lifetime  # reset lifetime
+            matched.add(j)
+        added = [copy(no) for j, no in enumerate(obstacles) if j not in matched]
+
         marked_for_removal = []
         for i, o in enumerate(self.obstacles):
-            for no in obstacles:
-                distance = np.linalg.norm(o.position - no.position)
-                
-                # the distance from the closest edge of the first obstacle to the far edge of the second obstacle
-                edge_distance = distance + no.radius - o.radius
-                if edge_distance < obstacle_distance_tolerance:
-                    o.radius = (o.radius + no.radius) / 2  # average radius
-                    o.lifetime = no.lifetime  # reset lifetime
-                    obstacles.remove(no)
             if dt != -1:
                 # print(o)
                 if(o.lifetime == np.inf):
@@ -69,8 +90,8 @@ class ObstacleMap(FlatMap):
         for index in sorted(marked_for_removal, reverse=True):
             del self.obstacles[index]
         
-        self.obstacles.extend([copy(o) for o in obstacles])
-        if obstacles or marked_for_removal:
+        self.obstacles.extend(added)
+        if added or marked_for_removal:
             grid_objects = [CircleGridObject(obstacle.position, obstacle.radius) for obstacle in self.obstacles]
             self.path_manager.set_objects(grid_objects)
             self.obstacles_dirty = True
@@ -93,22 +114,39 @@ class ObstacleMap(FlatMap):
         ticket = self.path_manager.request_path(
             start=start,
             goal_region=goal,
-            smooth=False,
+            smooth=True,
             temporary_obstacles=temporary_obstacles
         )
         # path = self.grid.find_path(start, goal, temporary_obstacles=temporary_obstacles)
         # path = self.grid.find_simple_path(start, goal)
         return ticket
     
+    def generate_paths(self, goals, temporary_obstacles: list[GridObject] = None) -> list:
+        """Request a path to each of `goals`, returning their tickets; see `best_path`."""
+        return [self.generate_path(goal, temporary_obstacles) for goal in goals]
+
     def get_path(self, ticket) -> Path:
         if(ticket in self.paths):
             return self.paths[ticket]
         
-        path, path_ticket = self.path_manager.get_path()
-        if path_ticket == ticket:
-            self.paths[path_ticket] = path
-            return path
-        return None
+        path = self.path_manager.get_path(ticket)
+        if path is not None:
+            self.paths[ticket] = path
+        return path
+
+    def cancel_path(self, ticket) -> None:
+        """Give up on a requested path, so the planners don't spend time on it."""
+        self.path_manager.cancel_path(ticket)
+
+    def best_path(self, tickets):
+        """
+        The shortest of the paths requested under `tickets` as (ticket, path), once all of them
+        have arrived, and None until then.
+        """
+        paths = [self.get_path(ticket) for ticket in tickets]
+        if any(path is None for path in paths):
+            return None
+        return min(zip(tickets, paths), key=lambda item: item[1].total_length)
     
     def need_replan(self, path: Path) -> bool:
         """Whether the current path is no longer valid due to either obstacles or having deviated too far."""
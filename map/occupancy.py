@@ -0,0 +1,244 @@
+import math
+from collections import OrderedDict
+import numpy as np
+from scipy.ndimage import distance_transform_edt
+
+from ezauv.map.grid_objects import GridObject
+
+# incremental occupancy for PathPlanner. each object is rasterized once into a stamp: its
+# footprint inflated by the planner's radius, kept as the slices of the grid it covers and a mask
+# over them. the grid itself holds a count of the stamps covering every cell, so an object is
+# added or removed by adding or subtracting its stamp, and only the changed objects are inflated.
+# the inflation is the same distance threshold compute_occupancy_grid applies to the whole grid,
+# taken over a window around the footprint padded by the radius, which contains every cell the
+# footprint can reach. it only depends on the footprint's shape, so inflated footprints are kept
+# by shape, and buoys of one size share them
+
+
+class OccupancyLayer:
+    KERNEL_CACHE_SIZE = 256
+
+    def __init__(self, shape, resolution, origin, radius):
+        """
+        shape: (rows, cols) of the grid
+        resolution: meters per cell
+        origin: world position of the grid's corner
+        radius: obstacle inflation radius
+        """
+        self.shape = shape
+        self.resolution = resolution
+        self.origin = origin
+        self.radius = radius
+        self.padding = math.ceil(radius / resolution) if radius > 0 else 0
+
+        self.counts = np.zeros(shape, dtype=np.int32)
+        self.grid = np.zeros(shape, dtype=bool)  # true where any stamp covers the cell
+        self.stamps = {}  # object key -> [stamp, number of objects with the key, one of the objects]
+        self._kernels = OrderedDict()  # footprint (shape, bytes) -> inflated footprint, least recently used first
+
+    def stamp(self, obj: GridObject):
+        """The inflated footprint of `obj` as (row slice, column slice, mask), or None if it covers no cell."""
+        found = self.footprint(obj)
+        if found is None:
+            return None
+        top, left, footprint = found
+        kernel = self.inflate(footprint)
+
+        # the kernel extends `padding` cells past the footprint; clip it to the grid
+        (row_min, row_max), (col_min, col_max) = self.bounds()
+        p = self.padding
+        r0, r1 = max(row_min, top - p), min(row_max, top + footprint.shape[0] + p)
+        c0, c1 = max(col_min, left - p), min(col_max, left + footprint.shape[1] + p)
+        if r0 >= r1 or c0 >= c1:
+            return None
+        window = kernel[r0 - (top - p):r1 - (top - p), c0 - (left - p):c1 - (left - p)]
+        return slice(r0, r1), slice(c0, c1), window
+
+    def footprint(self, obj: GridObject):
+        """The cells `obj` covers, cropped to them, as (top row, left column, mask), or None."""
+        rows, cols, mask = obj.rasterize_window(self.grid, self.resolution, self.origin)
+        occupied_rows = np.flatnonzero(mask.any(axis=1))
+        if len(occupied_rows) == 0:
+            return None
+        occupied_cols = np.flatnonzero(mask.any(axis=0))
+        footprint = mask[occupied_rows[0]:occupied_rows[-1] + 1, occupied_cols[0]:occupied_cols[-1] + 1]
+        return rows.start + occupied_rows[0], cols.start + occupied_cols[0], footprint
+
+    def bounds(self):
+        """The ((first row, end row), (first column, end column)) stamps are clipped to."""
+        return (0, self.shape[0]), (0, self.shape[1])
+
+    def window(self) -> np.ndarray:
+        """The grid in row-major order from its corner at `origin`."""
+        return self.grid
+
+    def inflate(self, footprint: np.ndarray) -> np.ndarray:
+        """`footprint` padded by the radius on every side and inflated by it. Shared and read-only."""
+        if self.padding == 0:
+            return footprint
+        key = (footprint.shape, footprint.tobytes())
+        kernel = self._kernels.get(key)
+        if kernel is not None:
+            self._kernels.move_to_end(key)
+            return kernel
+
+        p = self.padding
+        window = np.zeros((footprint.shape[0] + 2 * p, footprint.shape[1] + 2 * p), dtype=bool)
+        window[p:-p, p:-p] = footprint
+        kernel = distance_transform_edt(~window) * self.resolution <= self.radius
+        kernel.setflags(write=False)
+
+        self._kernels[key] = kernel
+        if len(self._kernels) > self.KERNEL_CACHE_SIZE:
+            self._kernels.popitem(last=False)
+        return kernel
+
+    def _apply(self, stamp, sign: int) -> None:
+        rows, cols, mask = stamp
+        counts = self.counts[rows, cols]
+        if sign > 0:
+            counts += mask
+        else:
+            counts -= mask
+        self.grid[rows, cols] = counts > 0
+
+    def set_objects(self, objects: list[GridObject]) -> bool:
+        """Make the layer hold exactly `objects`. Returns whether the grid changed."""
+        wanted = {}
+        for obj in objects:
+            key = obj.key()
+            if key in wanted:
+                wanted[key][1] += 1
+            else:
+                wanted[key] = [obj, 1]
+
+        changed = False
+        for key in list(self.stamps):
+            stamp, count, _ = self.stamps[key]
+            keep = wanted[key][1] if key in wanted else 0
+            for _ in range(count - keep):
+                if stamp is not None:
+                    self._apply(stamp, -1)
+                    changed = True
+            if keep == 0:
+                del self.stamps[key]
+            else:
+                self.stamps[key][1] = min(count, keep)
+
+        for key, (obj, count) in wanted.items():
+            if key in self.stamps:
+                entry = self.stamps[key]
+            else:
+                entry = self.stamps[key] = [self.stamp(obj), 0, obj]
+            for _ in range(count - entry[1]):
+                if entry[0] is not None:
+                    self._apply(entry[0], 1)
+                    changed = True
+            entry[1] = count
+
+        return changed
+
+
+class RollingOccupancy(OccupancyLayer):
+    # an OccupancyLayer over a window that moves with the vehicle, for PathPlanner's window_size.
+    # cells are addressed by absolute (row, column) from a fixed corner, `base`, and stored in
+    # place at (row % h, column % w), so moving the window leaves every cell still in it where it
+    # was. stamps are kept in absolute cells, and an object is rasterized over the window and a
+    # margin of the radius around it, so one just outside still inflates into it. on a shift, only
+    # the stamps that leave the new window, or that the old window clipped, are taken off and
+    # stamped again; everything else stays put. `window` unrolls the grid for the searches
+
+    def __init__(self, shape, resolution, base, radius, offset=(0, 0)):
+        """
+        base: world position of absolute cell (0, 0)'s corner
+        offset: absolute (row, column) of the window's first cell
+        """
+        self.base = np.asarray(base, dtype=float)
+        self.offset = tuple(offset)
+        super().__init__(shape, resolution, self.base + np.array([offset[1], offset[0]]) * resolution, radius)
+        p = self.padding
+        self._margin = np.zeros((shape[0] + 2 * p, shape[1] + 2 * p), dtype=bool)  # only its shape is read
+        self._window = None  # the unrolled grid, until the next change
+
+    def _origin(self, offset):
+        return self.base + np.array([offset[1], offset[0]]) * self.resolution
+
+    def footprint(self, obj: GridObject):
+        p = self.padding
+        corner = self.origin - p * self.resolution
+        if hasattr(obj, "bounding_box"):
+            # most objects on a long course are nowhere near the window
+            xmin, xmax, ymin, ymax = obj.bounding_box()
+            far = corner + np.array(self._margin.shape[::-1]) * self.resolution
+            if xmax < corner[0] or xmin > far[0] or ymax < corner[1] or ymin > far[1]:
+                return None
+        rows, cols, mask = obj.rasterize_window(self._margin, self.resolution, corner)
+        occupied_rows = np.flatnonzero(mask.any(axis=1))
+        if len(occupied_rows) == 0:
+            return None
+        occupied_cols = np.flatnonzero(mask.any(axis=0))
+        footprint = mask[occupied_rows[0]:occupied_rows[-1] + 1, occupied_cols[0]:occupied_cols[-1] + 1]
+        top = self.offset[0] - p + rows.start + occupied_rows[0]
+        left = self.offset[1] - p + cols.start + occupied_cols[0]
+        return top, left, footprint
+
+    def bounds(self):
+        (row, col), (h, w) = self.offset, self.shape
+        return (row, row + h), (col, col + w)
+
+    def _apply(self, stamp, sign: int) -> None:
+        rows, cols, mask = stamp
+        h, w = self.shape
+        cells = np.ix_(np.arange(rows.start, rows.stop) % h, np.arange(cols.start, cols.stop) % w)
+        counts = self.counts[cells]
+        if sign > 0:
+            counts += mask
+        else:
+            counts -= mask
+        self.counts[cells] = counts
+        self.grid[cells] = counts > 0
+        self._window = None
+
+    def shift(self, offset) -> bool:
+        """Move the window's first cell to absolute (row, column) `offset`. Returns whether the grid changed."""
+        offset = tuple(offset)
+        if offset == self.offset:
+            return False
+        (old_rows, old_cols), (new_rows, new_cols) = self.bounds(), (
+            (offset[0], offset[0] + self.shape[0]), (offset[1], offset[1] + self.shape[1]))
+
+        changed = False
+        restamp = []
+        for entry in self.stamps.values():
+            stamp, count, _ = entry
+            if stamp is not None:
+                rows, cols, _ = stamp
+                clipped = (rows.start == old_rows[0] or rows.stop == old_rows[1]
+                           or cols.start == old_cols[0] or cols.stop == old_cols[1])
+                inside = (rows.start >= new_rows[0] and rows.stop <= new_rows[1]
+                          and cols.start >= new_cols[0] and cols.stop <= new_cols[1])
+                if inside and not clipped:
+                    continue
+                for _ in range(count):
+                    self._apply(stamp, -1)
+                changed = True
+            restamp.append(entry)
+
+        # every cell leaving the window is now clear, ready to be reused for one entering it
+        self.offset = offset
+        self.origin = self._origin(offset)
+        for entry in restamp:
+            entry[0] = self.stamp(entry[2])
+            if entry[0] is not None:
+                for _ in range(entry[1]):
+                    self._apply(entry[0], 1)
+                changed = True
+        self._window = None
+        return changed
+
+    def window(self) -> np.ndarray:
+        """The grid in row-major order from the window's first cell. A copy, shared until the next change."""
+        if self._window is None:
+            h, w = self.shape
+            self._window = np.roll(self.grid, (-(self.offset[0] % h), -(self.offset[1] % w)), axis=(0, 1))
+        return self._window
@@ -2,6 +2,15 @@ import numpy as np
 
 
 class Path:
+    # nearest_point first projects onto the segments within WINDOW of the last nearest one, which
+    # is where a follower usually still is. the segments are also grouped CHUNK at a time under
+    # bounding boxes, and only the chunks whose box is no farther than the best so far are
+    # searched too, so the result is the same as projecting onto every segment. short paths are
+    # cheaper to project onto whole
+    WINDOW = 8
+    CHUNK = 16
+    SHORT = 64  # paths of at most this many segments are searched whole
+
     def __init__(self, waypoints):
         self.waypoints = np.asarray(waypoints, dtype=float)
 
@@ -27,27 +36,64 @@ class Path:
 
 
         self._last_index = 0
+        self._last_query = None  # (location, segment, t) of the last nearest_point
 
-    def nearest_point(self, location):
-        if self.finished:
-            return 0, 0.0
-        
-        P = np.asarray(location, dtype=float)
+        if not self.finished:
+            starts = np.arange(0, len(self.A), self.CHUNK)
+            self._chunk_min = np.minimum.reduceat(np.minimum(self.A, self.B), starts, axis=0)
+            self._chunk_max = np.maximum.reduceat(np.maximum(self.A, self.B), starts, axis=0)
 
-        AP = P - self.A
+    def _project(self, P, segments):
+        """Squared distance from P to, and clipped parameter along, each of `segments`."""
+        A, V = self.A[segments], self.V[segments]
+        AP = P - A
 
-        t = np.sum(AP * self.V, axis=1) / self.V2
+        t = np.sum(AP * V, axis=1) / self.V2[segments]
         t = np.clip(t, 0.0, 1.0)
 
-        proj = self.A + t[:, None] * self.V
+        proj = A + t[:, None] * V
 
         diff = P - proj
-        dist2 = np.sum(diff * diff, axis=1)
+        return np.sum(diff * diff, axis=1), t
 
-        i = np.argmin(dist2)
+    def nearest_point(self, location):
+        """The segment nearest to location and the parameter along it of the nearest point."""
+        if self.finished:
+            return 0, 0.0
+        
+        P = np.asarray(location, dtype=float)
+        if self._last_query is not None and np.array_equal(self._last_query[0], P):
+            return self._last_query[1], self._last_query[2]
+
+        n = len(self.A)
+        if n <= self.SHORT:
+            dist2, t = self._project(P, slice(0, n))
+            i = np.argmin(dist2)
+            u = t[i]
+        else:
+            lo = max(0, self._last_index - self.WINDOW)
+            hi = min(n, self._last_index + self.WINDOW + 1)
+            dist2, t = self._project(P, slice(lo, hi))
+            k = np.argmin(dist2)
+            i, u, best = lo + k, t[k], dist2[k]
+
+            gap = np.maximum(self._chunk_min - P, 0.0) + np.maximum(P - self._chunk_max, 0.0)
+            bound = np.sum(gap * gap, axis=1)
+            # the slack covers rounding in the projection; ties are searched too, for the lowest index
+            chunks = np.flatnonzero(bound <= best * (1 + 1e-9))
+            candidates = (chunks[:, None] * self.CHUNK + np.arange(self.CHUNK)).ravel()
+            candidates = candidates[(candidates < n) & ((candidates < lo) | (candidates >= hi))]
+            if len(candidates):
+                dist2, t = self._project(P, candidates)
+                k = np.argmin(dist2)  # candidates are in order, so this is the lowest index at its distance
+                if dist2[k] < best or (dist2[k] == best and candidates[k] < i):
+                    i, u = candidates[k], t[k]
+
+        i = int(i)
         self._last_index = i
+        self._last_query = (P.copy(), i, u)
 
-        return i, t[i]
+        return i, u
 
     def distance_traveled(self, location):
         """
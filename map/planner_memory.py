@@ -0,0 +1,143 @@
+from multiprocessing import shared_memory
+import os
+import time
+import numpy as np
+
+# shared memory between PathManager and one of its planner processes, so results and the
+# planner's grid reach the control process without pickling. the planner is the only writer and
+# PathManager the only reader. the grid is guarded by a seqlock: the writer makes its sequence
+# number odd, writes, then makes it even again, and a reader retries its copy until it saw the
+# same even number before and after. the layout is
+#   header     int64 [grid seq, grid path id, paths written, paths read, grid row, grid column]
+#   layers     uint8 (h, w), bit 0 set on blocked cells and bit 1 on goal cells
+#   slot info  int64 (slots, 2) [path id, waypoint count]
+#   waypoints  float64 (slots, capacity, 2)
+# paths are written round robin into the slots, which the reader consumes in order, and a slot is
+# only reused once the reader has counted it as read. a path longer than a slot's capacity, or
+# written while every slot is still unread, is sent through a queue instead, so no result is
+# dropped. the seqlock and the counters rely on stores becoming visible in the order they were
+# made, which x86 guarantees; the numpy copies give no barriers of their own. the grid row and
+# column are the cells its first cell is offset by from the planner's dimensions, which move
+# with a rolling window
+
+GRID_SEQ, GRID_PATH_ID, PATHS_WRITTEN, PATHS_READ, GRID_ROW, GRID_COL = range(6)
+PATH_ID, COUNT = range(2)
+
+BLOCKED = 1
+GOAL = 2
+
+
+class PlannerMemory:
+    READ_TIMEOUT = 0.05  # seconds read_grid retries a grid being written before giving up on it
+
+    def __init__(self, shape, slots: int = 4, capacity: int = 4096, name: str = None):
+        """
+        Creates the block, or attaches to the one called `name`. `shape` is the planner's grid
+        shape, and each of the `slots` result slots holds up to `capacity` waypoints.
+        """
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.capacity = capacity
+
+        h, w = self.shape
+        sizes = [6 * 8, h * w, slots * 2 * 8, slots * capacity * 2 * 8]
+        offsets = np.concatenate(([0], np.cumsum([(size + 7) // 8 * 8 for size in sizes])))
+        self.owner = os.getpid() if name is None else None  # only the creating process removes the block
+        self.memory = shared_memory.SharedMemory(name=name, create=name is None, size=int(offsets[-1]))
+
+        buffer = self.memory.buf
+        self.header = np.ndarray(6, dtype=np.int64, buffer=buffer, offset=offsets[0])
+        self.layers = np.ndarray(self.shape, dtype=np.uint8, buffer=buffer, offset=offsets[1])
+        self.slot_info = np.ndarray((slots, 2), dtype=np.int64, buffer=buffer, offset=offsets[2])
+        self.waypoints = np.ndarray((slots, capacity, 2), dtype=np.float64, buffer=buffer, offset=offsets[3])
+
+        self._last_grid = None  # the last grid read_grid got a consistent copy of
+
+        if name is None:
+            self.header[:] = (0, -1, 0, 0, 0, 0)
+            self.slot_info[:] = 0
+
+    def __reduce__(self):
+        # a planner process started with spawn attaches to the block by name
+        return PlannerMemory, (self.shape, self.slots, self.capacity, self.memory.name)
+
+    # writer side, in the planner process
+
+    def publish_grid(self, grid: np.ndarray, goal_window=None, path_id: int = -1, offset=(0, 0)) -> None:
+        """
+        Publish the grid the planner last planned on or received, and the goal cells of that
+        plan. `offset` is the (row, column) of the grid's first cell within the planner's dimensions.
+        """
+        header = self.header
+        header[GRID_SEQ] += 1
+        np.copyto(self.layers, grid, casting="unsafe")
+        if goal_window is not None:
+            rows, cols, mask = goal_window
+            self.layers[rows, cols] |= mask.astype(np.uint8) * GOAL
+        header[GRID_PATH_ID] = path_id
+        header[GRID_ROW], header[GRID_COL] = offset
+        header[GRID_SEQ] += 1
+
+    def publish_path(self, path_id: int, waypoints) -> bool:
+        """
+        Write a result into the next slot. Returns False if it is too long for a slot or every
+        slot is still unread, in which case the caller sends it through the queue.
+        """
+        header = self.header
+        written = int(header[PATHS_WRITTEN])
+        if len(waypoints) > self.capacity or written - int(header[PATHS_READ]) >= self.slots:
+            return False
+
+        slot = written % self.slots
+        info = self.slot_info[slot]
+        info[PATH_ID] = path_id
+        self.waypoints[slot, :len(waypoints)] = waypoints
+        info[COUNT] = len(waypoints)
+
+        header[PATHS_WRITTEN] = written + 1
+        return True
+
+    # reader side, in the control process
+
+    def read_grid(self):
+        """
+        A copy of the published layers, the id of the path planned on them and their (row,
+        column) offset, or None before any were published. If no consistent copy can be made
+        within READ_TIMEOUT, eg. because the planner died while writing, this is the last one
+        read, or None if there was none.
+        """
+        header = self.header
+        deadline = time.monotonic() + self.READ_TIMEOUT
+        while time.monotonic() < deadline:
+            seq = int(header[GRID_SEQ])
+            if seq == 0:
+                return None
+            if seq % 2:
+                time.sleep(0)  # let the writer finish
+                continue
+            layers = self.layers.copy()
+            path_id = int(header[GRID_PATH_ID])
+            offset = int(header[GRID_ROW]), int(header[GRID_COL])
+            if int(header[GRID_SEQ]) == seq:
+                self._last_grid = layers, path_id, offset
+                return self._last_grid
+        return self._last_grid
+
+    def read_paths(self) -> list[tuple[int, np.ndarray]]:
+        """The results written since the last call, oldest first, as (path id, waypoints)."""
+        header = self.header
+        results = []
+        read, written = int(header[PATHS_READ]), int(header[PATHS_WRITTEN])
+        for i in range(read, written):
+            # the writer never reuses an unread slot, so this slot holds result i until it is released
+            info = self.slot_info[i % self.slots]
+            results.append((int(info[PATH_ID]), self.waypoints[i % self.slots, :int(info[COUNT])].copy()))
+            header[PATHS_READ] = i + 1
+        return results
+
+    def close(self) -> None:
+        """Detach from the block, removing it if this side created it."""
+        self.header = self.layers = self.slot_info = self.waypoints = None
+        self.memory.close()
+        if self.owner == os.getpid():
+            self.memory.unlink()
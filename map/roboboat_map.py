@@ -75,14 +75,15 @@ class RoboBoatMap(ObstacleMap):
                     velocity_std: float,
                     position_std: float,
                     angle_std: float,
-                    rotational_velocity_std: float
+                    rotational_velocity_std: float,
+                    planner_options: dict = None
                  ):
         """
         Dimensions is a pair of tuples ((min_x, min_y), (max_x, max_y)). Keep in mind the bot starts at (0,0).
         Created based on the specifications of the 2026 RoboBoat competition.
         """
         R = np.diag([position_std**2, position_std**2, angle_std**2, velocity_std**2, velocity_std**2, rotational_velocity_std**2])
-        super().__init__(max_velocity, dimensions, bot_radius, resolution, R=R)
+        super().__init__(max_velocity, dimensions, bot_radius, resolution, R=R, planner_options=planner_options)
         self.entry_gates = []
         self.navigation_gates = []
         self.speed_challenge_gate = None
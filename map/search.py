@@ -0,0 +1,533 @@
+import heapq
+from array import array
+from enum import IntEnum
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+# search engines for PathPlanner. the occupancy grid is padded with a border of blocked cells and
+# flattened, so a cell is one integer and its neighbours are fixed offsets from it, with no bounds
+# checks. the per-cell state lives in plain Python lists, which are much faster to index one
+# element at a time than numpy arrays. costs are integers (1000 for a straight move, 1414 for a
+# diagonal one) so equal priorities compare exactly and can share a bucket in the open list
+
+
+class SearchType(IntEnum):
+    """Decides the search algorithm PathPlanner.find_path uses"""
+    HEAP = 0      # the original heapq A* over numpy arrays
+    ASTAR = 1     # flat-index A* with a bucketed open list
+    INCREMENTAL = 2  # D* Lite, repairing the last search to the same goal region between plans
+    JPS = 3       # jump point search, expanding only the cells where a path can turn
+
+
+class HeuristicType(IntEnum):
+    """Decides the heuristic the ASTAR and JPS searches use"""
+    OCTILE = 0          # octile distance to the goal region's mean cell
+    DISTANCE_FIELD = 1  # exact cost to the goal region over the static grid, cached per goal
+
+
+STRAIGHT = 1000
+DIAGONAL = 1414
+INF = 1 << 39
+KEY_SHIFT = 40  # D* Lite keys (k1, k2) are packed into one int as k1 << KEY_SHIFT | k2
+
+
+class FlatGrid:
+    """
+    Flat-index view of a (h, w) grid with a one-cell border. Cell (y, x) is index
+    (y + 1) * stride + x + 1. Holds the per-cell search state, reused between searches: a cell's
+    `g` and `parent` are only valid if its `seen` stamp matches the current search.
+    """
+    def __init__(self, shape):
+        self.shape = shape
+        h, w = shape
+        self.stride = w + 2
+        self.size = (h + 2) * (w + 2)
+
+        W = self.stride
+        self.neighbors = (
+            (-W, STRAIGHT), (W, STRAIGHT), (-1, STRAIGHT), (1, STRAIGHT),
+            (-W - 1, DIAGONAL), (-W + 1, DIAGONAL), (W - 1, DIAGONAL), (W + 1, DIAGONAL),
+        )
+
+        self.g = [0] * self.size
+        self.parent = [-1] * self.size
+        self.seen = [0] * self.size
+        self.closed = [0] * self.size
+        self.search_id = 0
+        self.expanded = 0  # cells expanded by the last search, for benchmarking
+
+    def index(self, y, x) -> int:
+        return (y + 1) * self.stride + x + 1
+
+    def cell(self, i) -> tuple[int, int]:
+        y, x = divmod(i, self.stride)
+        return y - 1, x - 1
+
+    def pad(self, grid: np.ndarray, border: bool) -> bytes:
+        """Flatten a boolean grid with a `border` of one cell, for byte-per-cell lookups."""
+        return np.pad(grid, 1, constant_values=border).tobytes()
+
+    def pad_window(self, window) -> bytes:
+        """Like `pad` with an empty border, for a mask given as a (row slice, column slice, mask) window."""
+        rows, cols, mask = window
+        padded = np.zeros((self.shape[0] + 2, self.stride), dtype=np.bool_)
+        padded[rows.start + 1:rows.stop + 1, cols.start + 1:cols.stop + 1] = mask
+        return padded.tobytes()
+
+    def octile(self, goal_y, goal_x):
+        """The octile-distance heuristic to a cell as a function of flat index."""
+        stride = self.stride
+        gy, gx = goal_y + 1, goal_x + 1
+
+        def h(i):
+            y, x = divmod(i, stride)
+            dy = y - gy if y > gy else gy - y
+            dx = x - gx if x > gx else gx - x
+            return STRAIGHT * dx + (DIAGONAL - STRAIGHT) * dy if dx > dy else STRAIGHT * dy + (DIAGONAL - STRAIGHT) * dx
+        return h
+
+    def distance_field(self, blocked: bytes, goal: bytes) -> array:
+        """
+        The cost of the cheapest path from every cell to a cell set in `goal`, over the cells not
+        set in `blocked`, by flat index; INF where no goal cell can be reached. A heuristic for
+        `astar` and `jps` that is exact on `blocked` and admissible on any grid blocking more.
+        """
+        free = ~np.frombuffer(blocked, dtype=np.bool_)
+        cells = np.flatnonzero(free)
+        W = self.stride
+        sources, targets, costs = [], [], []
+        # the border is blocked, so every free cell's neighbours are in range
+        for offset, cost in ((W, STRAIGHT), (1, STRAIGHT), (W - 1, DIAGONAL), (W + 1, DIAGONAL)):
+            linked = cells[free[cells + offset]]
+            sources.append(linked)
+            targets.append(linked + offset)
+            costs.append(np.full(len(linked), cost, dtype=np.float64))
+        graph = csr_matrix(
+            (np.concatenate(costs), (np.concatenate(sources), np.concatenate(targets))),
+            shape=(self.size, self.size),
+        )
+
+        goals = np.flatnonzero(np.frombuffer(goal, dtype=np.bool_) & free)
+        if len(goals) == 0:
+            return array("q", [INF]) * self.size
+        dist = dijkstra(graph, directed=False, indices=goals, min_only=True)
+        dist[~np.isfinite(dist)] = INF
+        return array("q", dist.astype(np.int64).tobytes())
+
+    def trace(self, i) -> list[tuple[int, int]]:
+        """The cells from the search's start to `i`, following parents."""
+        cells = []
+        parent = self.parent
+        while i >= 0:
+            cells.append(self.cell(i))
+            i = parent[i]
+        cells.reverse()
+        return cells
+
+    def astar(self, blocked: bytes, goal: bytes, start: int, heuristic) -> list[tuple[int, int]]:
+        """
+        A* from flat index `start` to any cell set in `goal`, over the cells not set in `blocked`.
+        `heuristic` is a function or a sequence of flat index. Returns the cells of the path, or None
+        if no goal cell is reachable.
+        \n
+        The open list is a heap of distinct priorities, each with a bucket of cells. Pushing to a
+        priority already open is an append, and cells of one priority pop last in, first out,
+        which favours the deeper of equally promising cells.
+        """
+        self.search_id += 1
+        search_id = self.search_id
+        g, parent, seen, closed = self.g, self.parent, self.seen, self.closed
+        neighbors = self.neighbors
+        h = heuristic if callable(heuristic) else heuristic.__getitem__
+
+        g[start] = 0
+        parent[start] = -1
+        seen[start] = search_id
+        f_start = h(start)
+        buckets = {f_start: [start]}
+        priorities = [f_start]
+        expanded = 0
+
+        while priorities:
+            f = heapq.heappop(priorities)
+            bucket = buckets.pop(f)
+            while bucket:
+                i = bucket.pop()
+                if closed[i] == search_id:
+                    continue
+                g_i = g[i]
+                if g_i + h(i) != f:
+                    continue  # queued again since with a lower cost
+                closed[i] = search_id
+                expanded += 1
+
+                if goal[i]:
+                    self.expanded = expanded
+                    return self.trace(i)
+
+                for offset, cost in neighbors:
+                    j = i + offset
+                    if blocked[j] or closed[j] == search_id:
+                        continue
+                    g_j = g_i + cost
+                    if seen[j] == search_id and g_j >= g[j]:
+                        continue
+                    seen[j] = search_id
+                    g[j] = g_j
+                    parent[j] = i
+
+                    f_j = g_j + h(j)
+                    if f_j == f:
+                        bucket.append(j)
+                    else:
+                        open_bucket = buckets.get(f_j)
+                        if open_bucket is None:
+                            buckets[f_j] = [j]
+                            heapq.heappush(priorities, f_j)
+                        else:
+                            open_bucket.append(j)
+
+        self.expanded = expanded
+        return None
+
+    def jump_tables(self, blocked: bytes, goal: bytes) -> tuple[bytes, bytes, bytes, bytes]:
+        """
+        Where a straight jump stops, for `jps`: for each of the four directions, the cells that
+        are blocked, goals or have a forced neighbour. The horizontal tables are row-major and
+        the vertical ones column-major, so every straight jump is one bytes.find.
+        """
+        H, W = self.shape[0] + 2, self.stride
+        b = np.frombuffer(blocked, dtype=np.bool_).reshape(H, W)
+        stop = b | np.frombuffer(goal, dtype=np.bool_).reshape(H, W)
+        free = ~b
+
+        right, left, down, up = (stop.copy() for _ in range(4))
+        inner = (slice(1, -1), slice(1, -1))
+        # moving along x, a blocked cell beside this one and a free one ahead of it force a turn
+        right[inner] |= (b[:-2, 1:-1] & free[:-2, 2:]) | (b[2:, 1:-1] & free[2:, 2:])
+        left[inner] |= (b[:-2, 1:-1] & free[:-2, :-2]) | (b[2:, 1:-1] & free[2:, :-2])
+        down[inner] |= (b[1:-1, :-2] & free[2:, :-2]) | (b[1:-1, 2:] & free[2:, 2:])
+        up[inner] |= (b[1:-1, :-2] & free[:-2, :-2]) | (b[1:-1, 2:] & free[:-2, 2:])
+        return right.tobytes(), left.tobytes(), down.T.tobytes(), up.T.tobytes()
+
+    def jps(self, blocked: bytes, goal: bytes, tables, start: int, heuristic) -> list[tuple[int, int]]:
+        """
+        Jump point search from flat index `start` to any cell set in `goal`, with `tables` from
+        `jump_tables`. Takes the same arguments otherwise, and finds paths as short as `astar`:
+        moves between any two free cells are allowed, diagonals included, so this uses the
+        pruning rules for diagonal moves that may cut corners. `expanded` counts jump points.
+        """
+        self.search_id += 1
+        search_id = self.search_id
+        g, parent, seen, closed = self.g, self.parent, self.seen, self.closed
+        h = heuristic if callable(heuristic) else heuristic.__getitem__
+        right, left, down, up = tables
+        H, W = self.shape[0] + 2, self.stride
+
+        def jump_x(i, dx):
+            j = right.find(1, i + 1) if dx > 0 else left.rfind(1, 0, i)
+            return -1 if blocked[j] else j
+
+        def jump_y(i, dy):
+            y, x = divmod(i, W)
+            column = x * H
+            t = down.find(1, column + y + 1) if dy > 0 else up.rfind(1, column, column + y)
+            j = (t - column) * W + x
+            return -1 if blocked[j] else j
+
+        def jump_diagonal(i, dy, dx):
+            step = dy * W + dx
+            vy = dy * W
+            while True:
+                i += step
+                if blocked[i]:
+                    return -1
+                if goal[i]:
+                    return i
+                if (blocked[i - dx] and not blocked[i - dx + vy]) or (blocked[i - vy] and not blocked[i + dx - vy]):
+                    return i
+                if jump_x(i, dx) >= 0 or jump_y(i, dy) >= 0:
+                    return i
+
+        def directions(i):
+            p = parent[i]
+            if p < 0:
+                return ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
+            y, x = divmod(i, W)
+            py, px = divmod(p, W)
+            dy = (y > py) - (y < py)
+            dx = (x > px) - (x < px)
+            if dy and dx:
+                dirs = [(0, dx), (dy, 0), (dy, dx)]
+                if blocked[i - dx]:
+                    dirs.append((dy, -dx))
+                if blocked[i - dy * W]:
+                    dirs.append((-dy, dx))
+            elif dx:
+                dirs = [(0, dx)]
+                if blocked[i - W]:
+                    dirs.append((-1, dx))
+                if blocked[i + W]:
+                    dirs.append((1, dx))
+            else:
+                dirs = [(dy, 0)]
+                if blocked[i - 1]:
+                    dirs.append((dy, -1))
+                if blocked[i + 1]:
+                    dirs.append((dy, 1))
+            return dirs
+
+        g[start] = 0
+        parent[start] = -1
+        seen[start] = search_id
+        f_start = h(start)
+        buckets = {f_start: [start]}
+        priorities = [f_start]
+        expanded = 0
+
+        while priorities:
+            f = heapq.heappop(priorities)
+            bucket = buckets.pop(f)
+            while bucket:
+                i = bucket.pop()
+                if closed[i] == search_id:
+                    continue
+                g_i = g[i]
+                if g_i + h(i) != f:
+                    continue
+                closed[i] = search_id
+                expanded += 1
+
+                if goal[i]:
+                    self.expanded = expanded
+                    return self.trace_jumps(i)
+
+                for dy, dx in directions(i):
+                    if dy and dx:
+                        j = jump_diagonal(i, dy, dx)
+                    elif dx:
+                        j = jump_x(i, dx)
+                    else:
+                        j = jump_y(i, dy)
+                    if j < 0 or closed[j] == search_id:
+                        continue
+
+                    steps = abs(j // W - i // W) if dy else abs(j - i)
+                    g_j = g_i + steps * (DIAGONAL if dy and dx else STRAIGHT)
+                    if seen[j] == search_id and g_j >= g[j]:
+                        continue
+                    seen[j] = search_id
+                    g[j] = g_j
+                    parent[j] = i
+
+                    f_j = g_j + h(j)
+                    if f_j == f:
+                        bucket.append(j)
+                    else:
+                        open_bucket = buckets.get(f_j)
+                        if open_bucket is None:
+                            buckets[f_j] = [j]
+                            heapq.heappush(priorities, f_j)
+                        else:
+                            open_bucket.append(j)
+
+        self.expanded = expanded
+        return None
+
+    def trace_jumps(self, i) -> list[tuple[int, int]]:
+        """The cells from the search's start to `i`, filling in the straight runs between jump points."""
+        cells = [self.cell(i)]
+        parent = self.parent
+        while parent[i] >= 0:
+            p = parent[i]
+            (y, x), (py, px) = self.cell(i), self.cell(p)
+            dy = (py > y) - (py < y)
+            dx = (px > x) - (px < x)
+            for _ in range(max(abs(py - y), abs(px - x))):
+                y += dy
+                x += dx
+                cells.append((y, x))
+            i = p
+        cells.reverse()
+        return cells
+
+
+class IncrementalSearch:
+    """
+    D* Lite toward one goal region, over a FlatGrid's indexing. The search runs backward from the
+    goal cells, so `g` of a cell is its cost to the goal; the state is kept between plans and
+    only the cells around those that became blocked or free since the last plan are repaired,
+    along with the keys of a moved start.
+    \n
+    Moves have the same costs as FlatGrid.astar: a move is allowed between any two free cells,
+    diagonals included.
+    \n
+    Repairs are cheap for changes near the start, which is where new obstacles are usually seen,
+    but a change near the goal invalidates most of the search and can cost more than searching
+    again from scratch.
+    """
+    # past this fraction of changed cells, repairing costs more than searching again
+    RESTART_FRACTION = 1 / 16
+
+    def __init__(self, flat: FlatGrid, goal: bytes):
+        self.flat = flat
+        self.goal = goal
+        self.blocked = None
+        self.expanded = 0  # cells expanded by the last plan, for benchmarking
+
+    def _reset(self, blocked: bytes, start: int) -> None:
+        size = self.flat.size
+        self.blocked = blocked
+        self.g = [INF] * size
+        self.rhs = [INF] * size
+        self.open = []
+        self.open_key = {}
+        self.km = 0
+        self.start = start
+
+        h = self._heuristic(start)
+        free_goals = np.frombuffer(self.goal, dtype=np.bool_) & ~np.frombuffer(blocked, dtype=np.bool_)
+        for i in np.flatnonzero(free_goals).tolist():
+            self.rhs[i] = 0
+            self._push(i, h(i) << KEY_SHIFT)
+
+    def _heuristic(self, start: int):
+        return self.flat.octile(*self.flat.cell(start))
+
+    def _push(self, i: int, key: int) -> None:
+        self.open_key[i] = key
+        heapq.heappush(self.open, (key, i))
+
+    def _recompute_rhs(self, i: int) -> None:
+        """Set rhs of `i` to its one-step lookahead cost through its free neighbours."""
+        blocked = self.blocked
+        if blocked[i]:
+            self.rhs[i] = INF
+        elif self.goal[i]:
+            self.rhs[i] = 0
+        else:
+            g = self.g
+            best = INF
+            for offset, cost in self.flat.neighbors:
+                j = i + offset
+                if not blocked[j]:
+                    c = cost + g[j]
+                    if c < best:
+                        best = c
+            self.rhs[i] = best
+
+    def _queue(self, i: int, h) -> None:
+        """Put `i` on the open list if it is inconsistent, and take it off otherwise."""
+        g_i, rhs_i = self.g[i], self.rhs[i]
+        if g_i != rhs_i:
+            m = g_i if g_i < rhs_i else rhs_i
+            self._push(i, (m + h(i) + self.km) << KEY_SHIFT | m)
+        else:
+            self.open_key.pop(i, None)
+
+    def _repair(self, blocked: bytes, h) -> bool:
+        """Apply the cells changed since the last plan. Returns False if too many changed."""
+        old = np.frombuffer(self.blocked, dtype=np.uint8)
+        new = np.frombuffer(blocked, dtype=np.uint8)
+        changed = np.flatnonzero(old != new)
+        self.blocked = blocked
+        if len(changed) > self.flat.size * self.RESTART_FRACTION:
+            return False
+
+        touched = set()
+        for i in changed.tolist():
+            touched.add(i)
+            touched.update(i + offset for offset, _ in self.flat.neighbors)
+        for i in touched:
+            if not blocked[i] or self.g[i] != INF or self.rhs[i] != INF:
+                self._recompute_rhs(i)
+                self._queue(i, h)
+        return True
+
+    def _compute(self, h) -> None:
+        g, rhs = self.g, self.rhs
+        open_list, open_key = self.open, self.open_key
+        blocked, goal = self.blocked, self.goal
+        neighbors = self.flat.neighbors
+        start, km = self.start, self.km
+        expanded = 0
+
+        while True:
+            while open_list and open_key.get(open_list[0][1]) != open_list[0][0]:
+                heapq.heappop(open_list)  # superseded or dequeued entry
+            g_start, rhs_start = g[start], rhs[start]
+            m = g_start if g_start < rhs_start else rhs_start
+            if not open_list or (open_list[0][0] >= ((m + km) << KEY_SHIFT | m) and g_start == rhs_start):
+                break
+
+            key, u = heapq.heappop(open_list)
+            del open_key[u]
+            g_u, rhs_u = g[u], rhs[u]
+            m = g_u if g_u < rhs_u else rhs_u
+            new_key = (m + h(u) + km) << KEY_SHIFT | m
+            if key < new_key:
+                self._push(u, new_key)  # its heuristic grew as the start moved
+                continue
+            expanded += 1
+
+            if g_u > rhs_u:
+                g[u] = rhs_u
+                for offset, cost in neighbors:
+                    p = u + offset
+                    if blocked[p]:
+                        continue
+                    c = cost + rhs_u
+                    if c < rhs[p]:
+                        rhs[p] = c
+                        self._queue(p, h)
+            else:
+                g[u] = INF
+                self._recompute_rhs(u)
+                self._queue(u, h)
+                for offset, cost in neighbors:
+                    p = u + offset
+                    if blocked[p] or goal[p]:
+                        continue
+                    if rhs[p] == cost + g_u:
+                        self._recompute_rhs(p)
+                        self._queue(p, h)
+
+        self.expanded = expanded
+
+    def plan(self, blocked: bytes, start: int) -> list[tuple[int, int]]:
+        """
+        The cells of a shortest path from flat index `start` to the goal region over the cells not
+        set in `blocked`, or None if the goal is unreachable. `start` must be free.
+        """
+        h = self._heuristic(start)
+        if self.blocked is None:
+            self._reset(blocked, start)
+        else:
+            if start != self.start:
+                self.km += self._heuristic(self.start)(start)
+                self.start = start
+            if blocked is not self.blocked and not self._repair(blocked, h):
+                self._reset(blocked, start)
+        self._compute(h)
+
+        g, goal, neighbors = self.g, self.goal, self.flat.neighbors
+        blocked = self.blocked
+        if g[start] >= INF:
+            return None
+
+        path = [start]
+        i = start
+        while not goal[i]:
+            best, best_j = INF, -1
+            for offset, cost in neighbors:
+                j = i + offset
+                if not blocked[j]:
+                    c = cost + g[j]
+                    if c < best:
+                        best, best_j = c, j
+            if best_j < 0 or len(path) > self.flat.size:
+                return None
+            i = best_j
+            path.append(i)
+        return [self.flat.cell(i) for i in path]
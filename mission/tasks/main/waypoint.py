@@ -54,6 +54,8 @@ class WaypointTask(DirectVelocityTask):
             if(type(self.goal) == list):
                 obstacles = self.goal[1]
                 goal = self.goal[0]
+            if self.wanted_ticket is not None:  # superseded before it arrived
+                self.map.cancel_path(self.wanted_ticket)
             self.wanted_ticket = self.map.generate_path(goal, temporary_obstacles=obstacles)
             self.debug_current_waypoint = goal
 
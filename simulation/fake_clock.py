@@ -14,4 +14,7 @@ class FakeClock(Clock):
         self.current_time += seconds
 
     def set_time(self, new_time):
-        self.current_time = new_time
\ No newline at end of file
+        self.current_time = new_time
+
+    def sleep_until(self, deadline, busy_wait=0.0):
+        self.current_time = max(self.current_time, deadline)
@@ -2,4 +2,5 @@ from ezauv.utils.inertia import InertiaGeometry, InertiaBuilder, Cuboid, HollowC
 from ezauv.utils.logger import Logger, LogLevel
 from ezauv.utils.pid import PID
 from ezauv.utils.clock import Clock
-from ezauv.utils.kalman_filter import KalmanFilter
\ No newline at end of file
+from ezauv.utils.kalman_filter import KalmanFilter
+from ezauv.utils.scheduler import LoopScheduler
\ No newline at end of file
@@ -8,4 +8,15 @@ class Clock:
         t.sleep(seconds)
 
     def perf_counter(self):
-        return t.perf_counter()
\ No newline at end of file
+        return t.perf_counter()
+
+    def sleep_until(self, deadline, busy_wait=0.0):
+        """
+        Sleep until `perf_counter` reaches `deadline`. The last `busy_wait` seconds are spent
+        spinning instead of sleeping, since the OS scheduler can wake a sleeping thread late.
+        """
+        remaining = deadline - self.perf_counter() - busy_wait
+        if remaining > 0:
+            self.sleep(remaining)
+        while self.perf_counter() < deadline:
+            pass
@@ -1,7 +1,29 @@
+import math
 import numpy as np
+from collections import deque, OrderedDict
 
 
 
+class MeasurementModel:
+    """
+    A measurement reading state entries directly, eg. a GPS reading x and y. H selects `indices`
+    from the state and R is the matching diagonal of the filter's noise, both built once. Get one
+    from `KalmanFilter.measurement_model` and pass it to `update` in place of H.
+    """
+    def __init__(self, indices, R_default, angle_index: int = 2):
+        self.indices = np.asarray(indices, dtype=int)
+        m = len(self.indices)
+
+        self.H = np.zeros((m, R_default.shape[0]))
+        self.H[np.arange(m), self.indices] = 1
+        self.H.setflags(write=False)
+        self.R_diag = np.diag(R_default)[self.indices].copy()
+
+        self.diagonal = (np.arange(m), np.arange(m))
+        # the residual of the first row measuring the angle is wrapped into [-pi, pi)
+        self.angle_rows = np.flatnonzero(self.indices == angle_index)[:1]
+
+
 class KalmanFilter:
     def __init__(self, H, R, P0, x0):
         self.H_default = H
@@ -9,62 +31,157 @@ class KalmanFilter:
         self.P = P0.copy()
         self.x = x0.copy()
 
+        self.models = {}  # state indices -> MeasurementModel
+
+        # scratch for `predict`, so propagating doesn't allocate
+        self._x = np.empty_like(self.x, dtype=float)
+        self._Bu = np.empty_like(self.x, dtype=float)
+        self._AP = np.empty_like(self.P, dtype=float)
+
     def predict(self, A, B, u, Q):
         """Predict step"""
         # Q = np.diag([0.01, 0.01, 0.001, 0.1, 0.1, 0.1])
-        self.x = A @ self.x + B @ u
-        self.P = A @ self.P @ A.T + Q
+        # x = A x + B u and P = A P A' + Q, written into preallocated arrays
+        np.matmul(A, self.x, out=self._x)
+        np.matmul(B, u, out=self._Bu)
+        self._x += self._Bu
+        self.x, self._x = self._x, self.x
+
+        np.matmul(A, self.P, out=self._AP)
+        np.matmul(self._AP, A.T, out=self.P)
+        self.P += Q
+
+    def measurement_model(self, indices) -> MeasurementModel:
+        """The cached MeasurementModel for a measurement of the given state indices, in order."""
+        key = tuple(indices)
+        model = self.models.get(key)
+        if model is None:
+            model = self.models[key] = MeasurementModel(key, self.R_default)
+        return model
 
     def update(self, z, H=None):
-        """Update step with arbitrary subset of measurements"""
-        if H is None:
-            H = self.H_default
-            R = self.R_default
+        """
+        Update step with arbitrary subset of measurements. `H` may be a MeasurementModel, which
+        skips building H and R.
+        """
+        z = np.asarray(z, dtype=float)
+
+        if isinstance(H, MeasurementModel):
+            indices = H.indices
+            PHt = self.P[:, indices]
+            S = PHt[indices]
+            S[H.diagonal] += H.R_diag
+            y = z - self.x[indices]  # residual
+            angle_rows = H.angle_rows
         else:
-            H = np.asarray(H)
-            R = np.zeros((H.shape[0], H.shape[0]))
-            for i, row in enumerate(H):
-                idxs = np.where(row != 0)[0]
-                if len(idxs) == 1:
-                    R[i, i] = self.R_default[idxs[0], idxs[0]]
-                else:
-                    R[i, i] = 1e-6  # fallback small noise
-
-        z = np.asarray(z)
-        y = z - H @ self.x  # residual
-
-        theta_idx = None
-        for i, row in enumerate(H):
-            if row[2] == 1:  # maps to theta in state
-                theta_idx = i
-                break
-        if theta_idx is not None:
-            y[theta_idx] = (y[theta_idx] + np.pi) % (2*np.pi) - np.pi
-
-        S = H @ self.P @ H.T + R
-        K = self.P @ H.T @ np.linalg.pinv(S)
-
-        self.x = self.x + K @ y
+            if H is None:
+                H = self.H_default
+                R = self.R_default
+            else:
+                H = np.asarray(H)
+                # rows reading a single state entry take its noise, others a small fallback noise
+                nonzero = H != 0
+                single = nonzero.sum(axis=1) == 1
+                R = np.diag(np.where(single, np.diag(self.R_default)[nonzero.argmax(axis=1)], 1e-6))
+            PHt = self.P @ H.T
+            S = H @ PHt + R
+            y = z - H @ self.x  # residual
+            angle_rows = np.flatnonzero(H[:, 2] == 1)[:1]  # maps to theta in state
+
+        y[angle_rows] = (y[angle_rows] + np.pi) % (2*np.pi) - np.pi
+
+        # K = P H' S^-1; solve S for the residual and H P together, one factorization for both.
+        # at these sizes LAPACK's solve is cheaper than scipy's Cholesky wrappers, and either
+        # is far cheaper than pinv's SVD
+        rhs = np.empty((len(y), len(self.x) + 1))
+        rhs[:, 0] = y
+        rhs[:, 1:] = PHt.T
+        try:
+            solved = np.linalg.solve(S, rhs)
+        except np.linalg.LinAlgError:
+            solved = np.linalg.pinv(S) @ rhs  # S is not positive definite, eg. a zero-noise row
+
+        self.x = self.x + PHt @ solved[:, 0]
         self.x[2] = (self.x[2] + np.pi) % (2*np.pi) - np.pi
 
-        I = np.eye(len(self.x))
-        self.P = (I - K @ H) @ self.P
+        # P - K H P, kept exactly symmetric; rounding in the asymmetric part otherwise compounds
+        self.P = self.P - PHt @ solved[:, 1:]
+        self.P += self.P.T
+        self.P *= 0.5
 
     def state(self):
         return self.x
 
 
 
+class _Record:
+    """One timestamped step of KalmanFilter2D's history, with the state right after it."""
+    __slots__ = ("time", "imu_accel", "measurements", "accel", "x", "P")
+
+    def __init__(self, time, imu_accel, measurements):
+        self.time = time
+        self.imu_accel = imu_accel        # the acceleration input read at this time, if any
+        self.measurements = measurements  # list of (z, H) applied at this time
+        self.accel = None                 # the acceleration input in effect after this time
+        self.x = None
+        self.P = None
+
+
 class KalmanFilter2D:
 
     def __init__(self, H, R, P0, x0,
-                 sigma_accel, sigma_gyro):
+                 sigma_accel, sigma_gyro, history_length: int = 512,
+                 dt_resolution: float = 1e-4, model_cache_size: int = 16,
+                 dt_tolerance: float = 1e-9):
+        """
+        `history_length` is how many timestamped steps are kept for `process` to rewind into when
+        a measurement arrives out of order.
+        \n
+        `build_matrices` keeps the last `model_cache_size` process models for dts on multiples of
+        `dt_resolution`, so a loop at a fixed rate builds its model once. A dt further than
+        `dt_tolerance` from a multiple is discretized exactly and not cached.
+        """
         self.kf = KalmanFilter(H, R, P0, x0)
 
         self.sigma_accel = sigma_accel
         self.sigma_gyro = sigma_gyro
 
+        self.history_length = history_length
+        self.history = deque()
+        self.time = None           # timestamp of the newest step in the history
+        self.accel = (0.0, 0.0)    # acceleration input in effect after the newest step
+
+        self.dt_resolution = dt_resolution
+        self.model_cache_size = model_cache_size
+        self.dt_tolerance = dt_tolerance
+        self._process_models = OrderedDict()  # quantized dt -> (A, B, Q), least recently used first
+        self._u = np.zeros(2)
+
     def build_matrices(self, dt):
+        """
+        The discretized (A, B, Q) for a step of `dt`. Steps on a multiple of `dt_resolution` are
+        shared through a small LRU cache, so the matrices are read-only.
+        """
+        key = round(dt / self.dt_resolution)
+        quantized = key * self.dt_resolution
+        if abs(dt - quantized) > self.dt_tolerance:
+            # off the grid, eg. a jittered or sub-resolution gap; rounding would change the step
+            return self._discretize(dt)
+
+        model = self._process_models.get(key)
+        if model is not None:
+            self._process_models.move_to_end(key)
+            return model
+
+        model = self._discretize(quantized)
+        for matrix in model:
+            matrix.setflags(write=False)
+        self._process_models[key] = model
+        if len(self._process_models) > self.model_cache_size:
+            self._process_models.popitem(last=False)
+        return model
+
+    def _discretize(self, dt):
         A = np.eye(6)
         A[0, 3] = dt
         A[1, 4] = dt
@@ -94,14 +211,88 @@ class KalmanFilter2D:
 
     def predict(self, dt, imu_accel):
         A, B, Q = self.build_matrices(dt)
-        u = np.array([imu_accel[0], imu_accel[1]])
+        u = self._u
+        u[0] = imu_accel[0]
+        u[1] = imu_accel[1]
         self.kf.predict(A, B, u, Q)
 
-        self.kf.x[2] = (self.kf.x[2] + np.pi) % (2*np.pi) - np.pi
+        # wrapped as a Python float; numpy scalar arithmetic costs more than the propagation
+        self.kf.x[2] = (float(self.kf.x[2]) + math.pi) % (2*math.pi) - math.pi
 
 
     def update(self, z, H=None):
         self.kf.update(z, H)
 
+    def measurement_model(self, indices) -> MeasurementModel:
+        return self.kf.measurement_model(indices)
+
+    def _step(self, record: _Record, previous_time: float, accel) -> tuple:
+        """
+        Predict from `previous_time` to the record and apply its measurements. The acceleration
+        read at a step drives the interval leading up to it, like `predict(dt, imu_accel)` does;
+        without one, the input in effect before is held. Returns the input in effect after.
+        """
+        if record.imu_accel is not None:
+            accel = record.imu_accel
+        dt = record.time - previous_time
+        if dt > 0:
+            self.predict(dt, accel)
+        for z, H in record.measurements:
+            self.kf.update(z, H)
+        record.accel = accel
+        record.x = self.kf.x.copy()
+        record.P = self.kf.P.copy()
+        return accel
+
+    def process(self, timestamp: float, imu_accel=None, z=None, H=None) -> bool:
+        """
+        Fuse a timestamped acceleration input and/or measurement (`z`, `H` as in `update`).
+        \n
+        In order, the filter is predicted forward to `timestamp`. Out of order, it is rewound to
+        the last step before `timestamp`, and the later steps are re-predicted and re-applied
+        around the new one. Returns False if `timestamp` is older than the whole history, in
+        which case nothing is fused.
+        """
+        measurements = [] if z is None else [(np.asarray(z), H)]
+        record = _Record(timestamp, imu_accel, measurements)
+
+        if self.time is None or timestamp >= self.time:
+            previous_time = timestamp if self.time is None else self.time
+            self.accel = self._step(record, previous_time, self.accel)
+            self.history.append(record)
+        else:
+            # the newest step at or before the new one; everything after it is replayed
+            index = len(self.history) - 1
+            while index >= 0 and self.history[index].time > timestamp:
+                index -= 1
+            if index < 0:
+                return False
+
+            base = self.history[index]
+            self.kf.x = base.x.copy()
+            self.kf.P = base.P.copy()
+            accel = base.accel
+
+            self.history.insert(index + 1, record)
+            previous_time = base.time
+            for replayed in list(self.history)[index + 1:]:
+                accel = self._step(replayed, previous_time, accel)
+                previous_time = replayed.time
+            self.accel = accel
+
+        self.time = self.history[-1].time
+        while len(self.history) > self.history_length:
+            self.history.popleft()
+        return True
+
+    def state_at(self, timestamp: float) -> np.ndarray:
+        """The state predicted forward to `timestamp`, without changing the filter."""
+        if self.time is None or timestamp <= self.time:
+            return self.kf.state()
+        A, B, _ = self.build_matrices(timestamp - self.time)
+        x = A @ self.kf.x + B @ np.asarray(self.accel, dtype=float)
+        x[2] = (x[2] + np.pi) % (2*np.pi) - np.pi
+        return x
+
     def state(self):
         return self.kf.state()
\ No newline at end of file
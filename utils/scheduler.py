@@ -0,0 +1,131 @@
+import bisect
+import time
+
+import numpy as np
+
+from ezauv.utils.clock import Clock
+
+# the main loop runs at a fixed rate. instead of sleeping for whatever is left of the period after
+# each iteration, which lets the error of every sleep add up, the scheduler keeps an absolute
+# deadline and moves it forward by exactly one period each iteration. if an iteration runs past
+# its deadline, it is counted as a miss and the missed periods are skipped, so the loop stays
+# aligned to the original grid instead of trying to catch up with a burst of short iterations
+
+
+class StageHistogram:
+    """
+    Timing histogram of one stage of the loop, with logarithmic bins from 1 µs to 10 s.
+    Keeps the count, total and max exactly; percentiles are read off the bins.
+    """
+    EDGES = np.logspace(-6, 1, 71).tolist()
+
+    def __init__(self):
+        self.bins = [0] * (len(self.EDGES) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.bins[bisect.bisect_right(self.EDGES, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Upper edge of the bin holding the q-th percentile (0 < q <= 100), capped at the max."""
+        if not self.count:
+            return 0.0
+        needed = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.bins):
+            seen += n
+            if seen >= needed:
+                return min(self.EDGES[i], self.max) if i < len(self.EDGES) else self.max
+        return self.max
+
+
+class LoopScheduler:
+    """
+    Runs a loop at a fixed period on absolute deadlines, driven by a Clock (or FakeClock).
+    \n
+    Call `start` before the first iteration, `lap` after each stage of an iteration to time it,
+    and `wait` at the end of each iteration to sleep until the next deadline. Stage times are
+    measured with `time.perf_counter`, so they are real even when a FakeClock drives the loop.
+    """
+    STAGES = ("sensor read", "map update", "task", "solve", "motor write")
+
+    def __init__(self, period: float, clock: Clock = Clock(), busy_wait: float = 0.0, stages=STAGES):
+        """
+        period: the time between the starts of two iterations, in seconds\n
+        clock: the clock deciding the deadlines\n
+        busy_wait: how long before each deadline to stop sleeping and spin, in seconds\n
+        stages: the names of the stages timed with `lap`
+        """
+        self.period = period
+        self.clock = clock
+        self.busy_wait = busy_wait
+
+        self.histograms = {stage: StageHistogram() for stage in stages}
+        self.histograms["loop"] = StageHistogram()
+
+        self.iterations = 0
+        self.misses = 0           # iterations that finished after their deadline
+        self.skipped_periods = 0  # periods dropped to get back onto the deadline grid
+
+        self.deadline = None
+        self._iteration_start = None
+        self._lap_start = None
+
+    def start(self):
+        """(Re)start the deadlines from now. Statistics are kept."""
+        self.deadline = self.clock.perf_counter()
+        self._iteration_start = self._lap_start = time.perf_counter()
+
+    def lap(self, stage: str):
+        """Record the time since the last lap (or the start of the iteration) under `stage`."""
+        now = time.perf_counter()
+        self.histograms[stage].add(now - self._lap_start)
+        self._lap_start = now
+
+    def wait(self) -> bool:
+        """
+        Sleep until the next deadline. Returns False if this iteration overran its deadline, in
+        which case the loop is moved on to the first deadline still ahead of it.
+        """
+        self.iterations += 1
+        self.deadline += self.period
+
+        overran = self.deadline < self.clock.perf_counter()
+        if overran:
+            self.misses += 1
+            late = self.clock.perf_counter() - self.deadline
+            skipped = int(late // self.period) + 1
+            self.skipped_periods += skipped
+            self.deadline += skipped * self.period
+
+        self.clock.sleep_until(self.deadline, self.busy_wait)
+
+        now = time.perf_counter()
+        self.histograms["loop"].add(now - self._iteration_start)
+        self._iteration_start = self._lap_start = now
+        return not overran
+
+    def summary(self) -> str:
+        """A human-readable summary of the deadline misses and stage timings."""
+        lines = [
+            f"{self.iterations} iterations at {1 / self.period:.1f} Hz, "
+            f"{self.misses} deadline misses ({self.skipped_periods} periods skipped)"
+        ]
+        for stage, histogram in self.histograms.items():
+            if not histogram.count:
+                continue
+            lines.append(
+                f"{stage:>12}: mean {histogram.mean() * 1e3:8.3f} ms, "
+                f"p99 < {histogram.percentile(99) * 1e3:8.3f} ms, "
+                f"max {histogram.max * 1e3:8.3f} ms"
+            )
+        return "\n".join(lines)